@@ -1,17 +1,20 @@
+import sqlite3
+import time
+
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
-router = APIRouter()
-
-# TEMP placeholders (you'll paste real helpers later)
-def make_token(username: str) -> str:
-    return f"token-for-{username}"
+from app.core.security import (
+    DUMMY_PASSWORD_HASH,
+    hash_password_async,
+    make_token,
+    needs_rehash,
+    verify_password_async,
+)
+from app.data.database import get_conn
 
-def md5_hash(pw: str) -> str:
-    return pw  # placeholder
-
-# TEMP in-memory user store (until DB extraction)
-USERS = {}
+router = APIRouter()
 
 class RegisterRequest(BaseModel):
     username: str
@@ -21,17 +24,46 @@ class LoginRequest(BaseModel):
     username: str
     password: str
 
+def _insert_user(username: str, pw_hash: str):
+    with get_conn() as conn:
+        conn.execute(
+            "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+            (username, pw_hash, int(time.time())),
+        )
+
+def _get_password_hash(username: str):
+    with get_conn() as conn:
+        row = conn.execute("SELECT password_hash FROM users WHERE username=?", (username,)).fetchone()
+    return row["password_hash"] if row else None
+
+def _update_password_hash(username: str, pw_hash: str):
+    with get_conn() as conn:
+        conn.execute("UPDATE users SET password_hash=? WHERE username=?", (pw_hash, username))
+
 @router.post("/register")
-def register(req: RegisterRequest):
+async def register(req: RegisterRequest):
     u = req.username.strip().lower()
-    if u in USERS:
+    if not u or not req.password:
+        raise HTTPException(status_code=400, detail="Username and password required")
+    if await run_in_threadpool(_get_password_hash, u) is not None:
+        # cheap early exit before paying for a hash
+        raise HTTPException(status_code=409, detail="Username already exists")
+    pw_hash = await hash_password_async(req.password)
+    try:
+        await run_in_threadpool(_insert_user, u, pw_hash)
+    except sqlite3.IntegrityError:
         raise HTTPException(status_code=409, detail="Username already exists")
-    USERS[u] = md5_hash(req.password)
     return {"message": "registered", "username": u}
 
 @router.post("/login")
-def login(req: LoginRequest):
+async def login(req: LoginRequest):
     u = req.username.strip().lower()
-    if u not in USERS or USERS[u] != md5_hash(req.password):
+    stored = await run_in_threadpool(_get_password_hash, u)
+    # unknown users still pay for a verify, so response time doesn't reveal which names exist
+    ok = await verify_password_async(req.password, stored if stored is not None else DUMMY_PASSWORD_HASH)
+    if stored is None or not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return {"access_token": make_token(u), "token_type": "bearer"}
\ No newline at end of file
+    if needs_rehash(stored):
+        # transparent migration off legacy MD5 (or old scrypt costs)
+        await run_in_threadpool(_update_password_hash, u, await hash_password_async(req.password))
+    return {"access_token": make_token(u), "token_type": "bearer"}
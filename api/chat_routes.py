@@ -1,42 +1,205 @@
-from fastapi import APIRouter, HTTPException, Header
-from typing import Optional
+import json
+import time
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
+from app.clients.groq_client import GroqError, groq_client
+from app.clients.llm_cache import LLM_CACHE, cache_key
+from app.core.config import GROQ_MODEL_DEFAULT, LLM_CACHE_ROUTES
+from app.core.admission import LLM_GATE, Slot
+from app.core.deps import get_rate_limited_user, llm_slot
+from app.core.profiling import phase
+from app.core.singleflight import SingleFlight
+from app.core.state import state_io
+from app.services.chat_service import CHAT_LOG_WRITER, SESSION_STORE, save_chat_to_db
+from app.services.content_service import get_content_context
+from app.services.retrieval_service import get_relevant_context
+from app.services.summary_service import map_reduce
+
 router = APIRouter()
 
-# TEMP placeholders
-def verify_token(token: str) -> str:
-    return "andrea"  # placeholder
+LLM_FLIGHT = SingleFlight("llm")
+
+async def _call_upstream(messages: List[Dict[str, str]], model: str) -> str:
+    try:
+        with phase("llm"):
+            reply = await groq_client.chat(messages, model)
+    except GroqError as e:
+        raise HTTPException(status_code=502, detail=f"LLM upstream error: {e}")
+    CHAT_LOG_WRITER.record_metric("llm_calls")
+    return reply
+
+async def _cached_upstream(key: str, messages: List[Dict[str, str]], model: str) -> str:
+    with phase("llm_cache"):
+        cached = LLM_CACHE.get_memory(key)
+        if cached is None:
+            cached = await run_in_threadpool(LLM_CACHE.get_disk, key)
+    if cached is not None:
+        return cached
+    reply = await _call_upstream(messages, model)
+    await run_in_threadpool(LLM_CACHE.set, key, model, reply)
+    return reply
+
+async def call_llm(messages: List[Dict[str, str]], model: str, use_cache: bool = False) -> str:
+    if not use_cache:
+        return await _call_upstream(messages, model)
+    # the same prompt arriving again while the first is in flight waits for that
+    # call (and its cache fill) instead of making its own; only done where a
+    # shared answer is acceptable, i.e. routes that opted into the cache
+    key = cache_key(model, messages)
+    return await LLM_FLIGHT.do(key, lambda: _cached_upstream(key, messages, model))
+
+def llm_cache_bypassed(header: Optional[str]) -> bool:
+    """`X-LLM-Cache: bypass` skips every response cache for one request."""
+    return (header or "").strip().lower() == "bypass"
+
+def llm_cache_enabled(route: str, header: Optional[str]) -> bool:
+    """Routes opt in via LLM_CACHE_ROUTES, unless the request bypasses caching."""
+    return route in LLM_CACHE_ROUTES and not llm_cache_bypassed(header)
+
+async def build_chat_messages(session_id: str, message: str) -> List[Dict[str, str]]:
+    # history may need a DB read; keep it off the event loop
+    with phase("history_load"):
+        history = await run_in_threadpool(SESSION_STORE.get, session_id)
+    with phase("context_build"):
+        # top-k passages relevant to this message; recent content if nothing matches
+        context = await run_in_threadpool(get_relevant_context, message)
+        if not context:
+            context = await get_content_context()
+        system_prompt = (
+            "You are an AI assistant for the AISE program.\n"
+            "Use the following content context when helpful:\n"
+            f"{context}"
+        )
+    return [{"role": "system", "content": system_prompt}] + history + [{"role": "user", "content": message}]
+
+class SlotStreamingResponse(StreamingResponse):
+    """Holds an LLM route slot until the response is done, including when the
+    client is gone before the body (or even the headers) could be sent."""
+
+    def __init__(self, content, slot: Slot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
 
-def groq_call_stub(messages, model: str) -> str:
-    return f"(stubbed {model}) ok"
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+def save_turn(session_id: str, message: str, reply: str):
+    SESSION_STORE.append(session_id, "user", message)
+    SESSION_STORE.append(session_id, "assistant", reply)
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
 class ChatRequest(BaseModel):
     message: str
-    model: str = "llama-3.3-70b-versatile"
+    model: str = GROQ_MODEL_DEFAULT
     session_id: Optional[str] = None
 
 class SummarizeRequest(BaseModel):
     text: str
-    model: str = "llama-3.3-70b-versatile"
+    model: str = GROQ_MODEL_DEFAULT
     session_id: Optional[str] = None
 
 @router.post("/chat")
-def chat(req: ChatRequest, authorization: Optional[str] = Header(default=None)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing bearer token")
-    token = authorization.split(" ", 1)[1]
-    _user = verify_token(token)
+async def chat(
+    req: ChatRequest,
+    username: str = Depends(get_rate_limited_user),
+    _slot: None = Depends(llm_slot),
+    x_llm_cache: Optional[str] = Header(default=None),
+):
+    session_id = req.session_id or f"{username}-{int(time.time())}"
+    messages = await build_chat_messages(session_id, req.message)
+
+    reply = await call_llm(messages, req.model, llm_cache_enabled("chat", x_llm_cache))
+
+    with phase("persistence"):
+        await state_io(save_turn, session_id, req.message, reply)
+    return {"reply": reply, "model": req.model, "session_id": session_id}
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest, username: str = Depends(get_rate_limited_user)):
+    session_id = req.session_id or f"{username}-{int(time.time())}"
+    # the slot is held for the whole stream, so it's released by the response, not a dependency
+    with phase("admission_wait"):
+        slot = await LLM_GATE.acquire()
+    try:
+        messages = await build_chat_messages(session_id, req.message)
+    except BaseException:
+        slot.release()
+        raise
 
-    reply = groq_call_stub([{"role": "user", "content": req.message}], req.model)
-    return {"reply": reply, "model": req.model, "session_id": req.session_id}
+    async def events():
+        # Starlette cancels this generator when the client disconnects; the
+        # cancellation closes the upstream stream and nothing is persisted.
+        parts = []
+        try:
+            async for token in groq_client.stream_chat(messages, req.model):
+                parts.append(token)
+                yield sse_event({"token": token})
+        except GroqError as e:
+            yield sse_event({"detail": f"LLM upstream error: {e}"}, event="error")
+            return
+        finally:
+            slot.release()  # free it before persisting; the response releases it again (no-op)
+        reply = "".join(parts)
+        CHAT_LOG_WRITER.record_metric("llm_calls")
+        await state_io(save_turn, session_id, req.message, reply)
+        yield sse_event({"reply": reply, "model": req.model, "session_id": session_id}, event="done")
+
+    return SlotStreamingResponse(
+        events(),
+        slot,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.post("/summarize")
-def summarize(req: SummarizeRequest, authorization: Optional[str] = Header(default=None)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing bearer token")
-    token = authorization.split(" ", 1)[1]
-    _user = verify_token(token)
-
-    summary = groq_call_stub([{"role": "user", "content": req.text}], req.model)
-    return {"summary": summary, "model": req.model, "session_id": req.session_id}
\ No newline at end of file
+async def summarize(
+    req: SummarizeRequest,
+    username: str = Depends(get_rate_limited_user),
+    _slot: None = Depends(llm_slot),
+    x_llm_cache: Optional[str] = Header(default=None),
+):
+    session_id = req.session_id or f"{username}-sum-{int(time.time())}"
+    prompt = f"Summarize in 2-3 sentences:\n\n{req.text}"
+    use_cache = llm_cache_enabled("summarize", x_llm_cache)
+
+    async def llm(messages: List[Dict[str, str]]) -> str:
+        return await call_llm(messages, req.model, use_cache)
+
+    # long inputs are summarized chunk by chunk first, then reduced to one prompt
+    with phase("map_reduce"):
+        reduced = await map_reduce(req.text, req.model, llm, llm_cache_bypassed(x_llm_cache))
+    final_prompt = prompt if reduced["chunks"] == 1 else f"Summarize in 2-3 sentences:\n\n{reduced['text']}"
+
+    with phase("context_build"):
+        system_prompt = (
+            "You summarize for AISE program notes.\n"
+            "Consider this content context:\n"
+            f"{await get_content_context()}"
+        )
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": final_prompt},
+    ]
+    summary = await call_llm(messages, req.model, use_cache)
+
+    with phase("persistence"):
+        save_chat_to_db(session_id, "user", prompt)
+        save_chat_to_db(session_id, "assistant", summary)
+    return {
+        "summary": summary,
+        "model": req.model,
+        "session_id": session_id,
+        "original_length": len(req.text),
+        "chunks": reduced["chunks"],
+    }
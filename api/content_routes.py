@@ -1,14 +1,33 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Header
-from typing import Optional
-from pydantic import BaseModel
+import json
+import logging
 
-router = APIRouter()
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+
+from app.core.config import BULK_BATCH_SIZE, BULK_MAX_ERRORS, BULK_MAX_LINE_BYTES
+from app.core.deps import get_current_user
+from app.core.profiling import phase
+from app.core.singleflight import SingleFlight
+from app.core.state import CONTENT_GENERATION, SEARCH_CACHE, state_io
+from app.services.content_service import (
+    UploadTooLarge,
+    bulk_create_content,
+    create_content,
+    iter_content_ndjson,
+    list_content,
+    search_content,
+    submit_upload,
+)
+from app.services.job_service import JOB_QUEUE, JobQueueFull
 
-# TEMP placeholders
-def verify_token(token: str) -> str:
-    return "andrea"
+log = logging.getLogger(__name__)
+
+router = APIRouter()
 
-CONTENT = []  # placeholder until DB extraction
+SEARCH_FLIGHT = SingleFlight("search")
 
 class ContentCreateRequest(BaseModel):
     title: str
@@ -16,36 +35,161 @@ class ContentCreateRequest(BaseModel):
 
 class ContentSearchRequest(BaseModel):
     query: str
+    limit: int = Field(default=20, ge=1, le=100)
+    offset: int = Field(default=0, ge=0)
 
 @router.post("/content/create")
-def content_create(req: ContentCreateRequest, authorization: Optional[str] = Header(default=None)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing bearer token")
-    token = authorization.split(" ", 1)[1]
-    _user = verify_token(token)
-
-    CONTENT.append({"title": req.title, "body": req.body})
+def content_create(req: ContentCreateRequest, _user: str = Depends(get_current_user)):
+    create_content(req.title, req.body)
     return {"message": "content created"}
 
-@router.post("/content/upload")
-async def content_upload(file: UploadFile = File(...), authorization: Optional[str] = Header(default=None)):
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing bearer token")
-    token = authorization.split(" ", 1)[1]
-    _user = verify_token(token)
+@router.post("/content/upload", status_code=202)
+async def content_upload(file: UploadFile = File(...), _user: str = Depends(get_current_user)):
+    title = file.filename or "upload"
+    # copy the upload to the job spool on a worker thread; splitting, inserting
+    # and indexing happen in the background job
+    try:
+        job_id = await run_in_threadpool(submit_upload, file.file, title)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return {"message": "accepted", "title": title, "job_id": job_id, "status_url": f"/content/jobs/{job_id}"}
+
+@router.get("/content/jobs/{job_id}")
+def content_job(job_id: int, _user: str = Depends(get_current_user)):
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def _parse_bulk_line(raw: bytes) -> Tuple[str, str]:
+    try:
+        item = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"invalid JSON: {e}")
+    if not isinstance(item, dict):
+        raise ValueError("expected an object with title and body")
+    title, body = item.get("title"), item.get("body")
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("title must be a non-empty string")
+    if not isinstance(body, str) or not body.strip():
+        raise ValueError("body must be a non-empty string")
+    return title, body
+
+@router.post("/content/bulk")
+async def content_bulk(request: Request, _user: str = Depends(get_current_user)):
+    """
+    NDJSON import: one {"title", "body"} object per line. The body is parsed as
+    it streams in and inserted BULK_BATCH_SIZE rows per transaction. Bad lines
+    are skipped and reported by line number; good lines are still imported. A
+    batch whose transaction fails is rolled back and reported as one error
+    spanning its lines, and the import carries on with the next batch.
+    """
+    inserted, failed = 0, 0
+    errors: List[Dict[str, Any]] = []
+    batch: List[Tuple[str, str]] = []
+    batch_first = batch_last = 0  # line numbers of the batch's first and last rows
+    line_no = 0
+    buf = b""
 
-    raw = await file.read()
-    CONTENT.append({"title": file.filename or "upload", "body": raw.decode("utf-8", errors="ignore")})
-    return {"message": "uploaded"}
+    def fail(message: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < BULK_MAX_ERRORS:
+            errors.append({"line": line_no, "error": message})
+
+    async def flush():
+        nonlocal inserted, failed, batch
+        if batch:
+            rows, batch = batch, []
+            try:
+                with phase("bulk_insert"):
+                    inserted += await run_in_threadpool(bulk_create_content, rows)
+            except Exception as e:
+                log.exception("bulk import: batch of lines %d-%d failed", batch_first, batch_last)
+                failed += len(rows)
+                if len(errors) < BULK_MAX_ERRORS:
+                    errors.append({"line": batch_first, "last_line": batch_last, "error": f"batch insert failed: {e}"})
+
+    def handle(raw: bytes):
+        nonlocal line_no, batch_first, batch_last
+        line_no += 1
+        if not raw.strip():
+            return
+        if len(raw) > BULK_MAX_LINE_BYTES:
+            return fail(f"line exceeds {BULK_MAX_LINE_BYTES} bytes")
+        try:
+            row = _parse_bulk_line(raw)
+        except ValueError as e:
+            return fail(str(e))
+        if not batch:
+            batch_first = line_no
+        batch_last = line_no
+        batch.append(row)
+
+    skipping = False  # inside an over-long line: discard input up to the next newline
+    async for chunk in request.stream():
+        if skipping:
+            nl = chunk.find(b"\n")
+            if nl < 0:
+                continue
+            chunk, skipping = chunk[nl + 1:], False
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for raw in lines:
+            handle(raw)
+        if len(buf) > BULK_MAX_LINE_BYTES:
+            # same per-line error as a too-long line that arrived whole
+            line_no += 1
+            fail(f"line exceeds {BULK_MAX_LINE_BYTES} bytes")
+            buf, skipping = b"", True
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+    if not skipping:
+        handle(buf)
+    await flush()
+
+    return {
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+    }
 
 @router.get("/content/list")
-def content_list():
-    return {"items": CONTENT}
+def content_list(
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[int] = Query(default=None, description="id to continue after (next_cursor of the previous page)"),
+    format: str = Query(default="json", pattern="^(json|ndjson)$"),
+    stream_limit: Optional[int] = Query(default=None, ge=1, description="ndjson only; default streams everything"),
+):
+    if format == "ndjson":
+        return StreamingResponse(iter_content_ndjson(cursor, stream_limit), media_type="application/x-ndjson")
+    items, next_cursor = list_content(limit, cursor)
+    return {"items": items, "next_cursor": next_cursor}
+
+def _search_cache_lookup(q: str, limit: int, offset: int) -> Tuple[tuple, Any]:
+    # any content write bumps the generation, so older entries are never served again
+    key = (CONTENT_GENERATION.value, q, limit, offset)
+    return key, SEARCH_CACHE.get(key)
 
 @router.post("/content/search")
-def content_search(req: ContentSearchRequest):
+async def content_search(req: ContentSearchRequest):
     q = req.query.strip().lower()
     if not q:
         raise HTTPException(status_code=400, detail="query required")
-    results = [c for c in CONTENT if q in c["title"].lower() or q in c["body"].lower()]
-    return {"cached": False, "results": [{"title": r["title"]} for r in results]}
\ No newline at end of file
+    with phase("cache_lookup"):
+        key, cached = await state_io(_search_cache_lookup, q, req.limit, req.offset)
+    if cached is not None:
+        return {"cached": True, "results": cached}
+
+    async def run_search():
+        results = await run_in_threadpool(search_content, q, req.limit, req.offset)
+        await state_io(SEARCH_CACHE.set, key, results)
+        return results
+
+    # a burst of identical misses runs one FTS query; the rest await its result
+    with phase("search"):
+        results = await SEARCH_FLIGHT.do(key, run_search)
+    return {"cached": False, "results": results}
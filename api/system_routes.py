@@ -1,9 +1,25 @@
-from fastapi import APIRouter
-import os
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from typing import Optional
 
-router = APIRouter()
+from app.clients.groq_client import groq_client
+from app.clients.llm_cache import LLM_CACHE
+from app.core.admission import LLM_GATE, RATE_LIMITER
+from app.core.config import APP_ENV
+from app.core.metrics import REGISTRY
+from app.core.profiling import list_profiles, profile_path, require_profiling_access
+from app.core.security import TOKEN_CACHE
+from app.core.singleflight import GROUPS as SINGLEFLIGHT_GROUPS
+from app.core.state import SEARCH_CACHE
+from app.data.database import schema_version
+from app.services.analytics_service import METRICS, RESOLUTIONS, get_counter, get_counters, get_series
+from app.services.chat_service import CHAT_LOG_WRITER, SESSION_STORE
+from app.services.content_service import CONTENT_CONTEXT
+from app.services.job_service import JOB_QUEUE
+from app.services.retention_service import CHAT_ARCHIVER
+from app.services.retrieval_service import RETRIEVAL_INDEX, RETRIEVAL_SYNCER
 
-APP_ENV = os.getenv("APP_ENV", "dev")
+router = APIRouter()
 
 @router.get("/health")
 def health():
@@ -11,12 +27,68 @@ def health():
 
 @router.get("/system/profile")
 def system_profile():
-    return {"app": "AISE Monolith Practice", "env": APP_ENV}
+    return {
+        "app": "AISE Monolith Practice",
+        "env": APP_ENV,
+        "search_cache": SEARCH_CACHE.stats(),
+        "active_sessions": len(SESSION_STORE),
+        "sessions": SESSION_STORE.stats(),
+        "chat_log_writer": CHAT_LOG_WRITER.stats(),
+        "llm_client": groq_client.stats(),
+        "content_context_rebuilds": CONTENT_CONTEXT.rebuilds,
+        "token_cache": TOKEN_CACHE.stats(),
+        "llm_cache": LLM_CACHE.stats(),
+        "retrieval_index": RETRIEVAL_INDEX.stats(),
+        "retrieval_sync": RETRIEVAL_SYNCER.stats(),
+        "chat_archiver": CHAT_ARCHIVER.stats(),
+        "jobs": JOB_QUEUE.stats(),
+        "llm_gate": LLM_GATE.stats(),
+        "rate_limiter": RATE_LIMITER.stats(),
+        "singleflight": {g.name: g.stats() for g in SINGLEFLIGHT_GROUPS},
+        "schema_version": schema_version(),
+    }
+
+@router.get("/system/metrics", response_class=PlainTextResponse)
+def system_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get("/system/profiles", dependencies=[Depends(require_profiling_access)])
+def system_profiles():
+    return {"profiles": list_profiles()}
+
+@router.get("/system/profiles/{profile_id}", dependencies=[Depends(require_profiling_access)])
+def system_profile_dump(profile_id: str):
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
 
 @router.get("/analytics/users")
 def analytics_users():
-    return {"user_count": 0}  # placeholder until DB extraction
+    return {"user_count": get_counter("registrations")}
 
 @router.get("/analytics/content")
 def analytics_content():
-    return {"content_count": 0}  # placeholder until DB extraction
\ No newline at end of file
+    return {"content_count": get_counter("content_writes")}
+
+@router.get("/analytics/counters")
+def analytics_counters():
+    return get_counters()
+
+@router.get("/analytics/series")
+def analytics_series(
+    metric: str,
+    resolution: str = Query(default="minute", pattern="^(minute|hour)$"),
+    start: Optional[int] = Query(default=None, description="unix seconds; default 60 buckets before end"),
+    end: Optional[int] = Query(default=None, description="unix seconds; default now"),
+):
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(METRICS)}")
+    buckets = get_series(metric, resolution, start, end)
+    return {
+        "metric": metric,
+        "resolution": resolution,
+        "bucket_seconds": RESOLUTIONS[resolution][1],
+        "buckets": buckets,
+        "total": sum(b["value"] for b in buckets),
+    }
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -5,8 +7,37 @@ from app.api.auth_routes import router as auth_router
 from app.api.chat_routes import router as chat_router
 from app.api.content_routes import router as content_router
 from app.api.system_routes import router as system_router
+from app.clients.groq_client import groq_client
+from app.core.config import PROFILING_ENABLED
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.security import shutdown_hash_pool, warm_hash_pool
+from app.data.database import init_db, pool
+from app.services.chat_service import CHAT_LOG_WRITER
+from app.services.job_service import JOB_QUEUE
+from app.services.retention_service import CHAT_ARCHIVER
+from app.services.retrieval_service import RETRIEVAL_INDEX, RETRIEVAL_SYNCER, init_retrieval_index
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    init_retrieval_index()
+    RETRIEVAL_SYNCER.start()
+    CHAT_LOG_WRITER.start()
+    CHAT_ARCHIVER.start()
+    JOB_QUEUE.start()  # also resumes jobs left pending by the previous run
+    await warm_hash_pool()
+    yield
+    JOB_QUEUE.stop()
+    RETRIEVAL_SYNCER.stop()
+    CHAT_ARCHIVER.stop()
+    await groq_client.aclose()
+    shutdown_hash_pool()
+    CHAT_LOG_WRITER.stop()  # flush queued chat logs before the pool goes away
+    RETRIEVAL_INDEX.save()  # next startup maps this and only embeds newer rows
+    pool.close_all()
 
-app = FastAPI(title="AISE Monolith Practice")
+app = FastAPI(title="AISE Monolith Practice", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,8 +46,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
 
 app.include_router(system_router)
 app.include_router(auth_router)
 app.include_router(chat_router)
-app.include_router(content_router)
\ No newline at end of file
+app.include_router(content_router)
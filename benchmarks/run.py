@@ -0,0 +1,170 @@
+"""
+In-process benchmark for the monolith and the extracted app.
+
+Drives each app through httpx.ASGITransport (no sockets, no uvicorn), runs the
+scripted workloads in benchmarks/workloads.py against a fresh database in a
+temp directory, and reports throughput and p50/p95/p99 latency per route.
+
+Run from the project root:
+  python -m benchmarks.run                                   # both apps, default scale
+  python -m benchmarks.run --save benchmarks/baseline.json   # record a baseline
+  python -m benchmarks.run --compare benchmarks/baseline.json --fail-on-regression
+
+Targets are "name=module:attr"; the defaults are legacy=legacy:app and
+modular=app.main:app.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.workloads import WORKLOADS, Recorder
+
+# The modules import each other as `app.*`. Alias the project root, and app/ for
+# app.main, as that package so the default target resolves from a plain checkout
+# (same as tests/conftest.py).
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_pkg = types.ModuleType("app")
+_pkg.__path__ = [ROOT, os.path.join(ROOT, "app")]
+sys.modules.setdefault("app", _pkg)
+
+DEFAULT_TARGETS = ["legacy=legacy:app", "modular=app.main:app"]
+SCALES = {
+    "small": dict(users=20, content_items=200, uploads=4, upload_kb=256, searches=400, chat_sessions=10, chat_turns=5, polls=50),
+    "medium": dict(users=100, content_items=2000, uploads=10, upload_kb=2048, searches=3000, chat_sessions=50, chat_turns=10, polls=300),
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def summarize(rec: Recorder, wall: Dict[str, float]) -> Dict[str, dict]:
+    routes = {}
+    for label, lats in sorted(rec.latencies.items()):
+        lats = sorted(lats)
+        first, last = rec.spans[label]
+        routes[label] = {
+            "count": len(lats),
+            "errors": rec.errors.get(label, 0),
+            "rps": round(len(lats) / (last - first), 1) if last > first else 0.0,
+            "p50_ms": round(percentile(lats, 50) * 1000, 3),
+            "p95_ms": round(percentile(lats, 95) * 1000, 3),
+            "p99_ms": round(percentile(lats, 99) * 1000, 3),
+        }
+    return {"routes": routes, "workload_seconds": {k: round(v, 3) for k, v in wall.items()}}
+
+
+def load_app(spec: str):
+    module_name, attr = spec.split(":", 1)
+    return getattr(importlib.import_module(module_name), attr)
+
+
+async def run_target(spec: str, ctx: dict, workloads: List[str]) -> dict:
+    # every target gets its own empty database in its own temp dir
+    # (legacy.py always opens ./app.db, the extracted app honours DB_PATH)
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    os.environ["DB_PATH"] = os.path.join(tmp, "app.db")
+    # the workloads drive every request through one user; measure throughput, not the rate limiter
+    os.environ.setdefault("RATE_LIMIT_BURST", str(10 ** 9))
+    sys.path.insert(0, cwd)
+    os.chdir(tmp)
+    try:
+        app = load_app(spec)
+        rec = Recorder()
+        wall = {}
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                for name in workloads:
+                    start = time.perf_counter()
+                    await WORKLOADS[name](client, rec, ctx)
+                    wall[name] = time.perf_counter() - start
+        return summarize(rec, wall)
+    finally:
+        os.chdir(cwd)
+        sys.path.remove(cwd)
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Flag routes whose p95 grew or throughput dropped by more than `threshold`."""
+    problems = []
+    for target, result in current["targets"].items():
+        base_routes = baseline.get("targets", {}).get(target, {}).get("routes", {})
+        for label, stats in result["routes"].items():
+            base = base_routes.get(label)
+            if not base:
+                continue
+            if base["p95_ms"] and stats["p95_ms"] > base["p95_ms"] * (1 + threshold):
+                problems.append(f"{target} {label}: p95 {base['p95_ms']}ms -> {stats['p95_ms']}ms")
+            if base["rps"] and stats["rps"] < base["rps"] * (1 - threshold):
+                problems.append(f"{target} {label}: rps {base['rps']} -> {stats['rps']}")
+            if stats["errors"] > base["errors"]:
+                problems.append(f"{target} {label}: errors {base['errors']} -> {stats['errors']}")
+    return problems
+
+
+def print_report(report: dict):
+    for target, result in report["targets"].items():
+        print(f"\n== {target}")
+        print(f"{'route':32} {'count':>7} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for label, s in result["routes"].items():
+            print(f"{label:32} {s['count']:>7} {s['errors']:>5} {s['rps']:>9} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9}")
+        print("workloads (s):", result["workload_seconds"])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", help="name=module:attr (repeatable)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workload", action="append", choices=list(WORKLOADS), help="subset to run (auth always runs)")
+    parser.add_argument("--save", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression (default 0.2)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    targets = dict(t.split("=", 1) for t in (args.target or DEFAULT_TARGETS))
+    workloads = [w for w in WORKLOADS if not args.workload or w in args.workload or w == "auth"]
+
+    report = {"scale": args.scale, "concurrency": args.concurrency, "workloads": workloads, "targets": {}}
+    for name, spec in targets.items():
+        ctx = dict(SCALES[args.scale], concurrency=args.concurrency)
+        report["targets"][name] = asyncio.run(run_target(spec, ctx, workloads))
+    print_report(report)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nsaved {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(report, json.load(f), args.threshold)
+        if problems:
+            print("\nREGRESSIONS:")
+            for p in problems:
+                print("  " + p)
+            if args.fail_on_regression:
+                return 1
+        else:
+            print("\nno regressions vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import asyncio
+import random
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+
+class Recorder:
+    """Collects per-route latencies (seconds), error counts and the time span each route was active."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.spans: Dict[str, List[float]] = {}  # label -> [first start, last end]
+
+    async def call(self, client: httpx.AsyncClient, method: str, route: str, **kwargs) -> Optional[httpx.Response]:
+        label = f"{method} {route}"
+        start = time.perf_counter()
+        try:
+            resp = await client.request(method, route, **kwargs)
+        except Exception:
+            resp = None
+        end = time.perf_counter()
+        self.latencies.setdefault(label, []).append(end - start)
+        span = self.spans.setdefault(label, [start, end])
+        span[1] = end
+        if resp is None or resp.status_code >= 400:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        return resp
+
+
+async def gather_limited(n: int, concurrency: int, fn: Callable[[int], Awaitable[None]]):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            await fn(i)
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+
+
+# ---------------------------
+# Workloads
+# Each takes (client, recorder, ctx) and returns nothing. ctx carries the
+# scale knobs plus anything earlier workloads produced (e.g. the auth header).
+# ---------------------------
+async def auth_burst(client: httpx.AsyncClient, rec: Recorder, ctx: dict):
+    users = [f"bench-{uuid.uuid4().hex[:8]}" for _ in range(ctx["users"])]
+
+    async def register(i: int):
+        await rec.call(client, "POST", "/register", json={"username": users[i], "password": "pw"})
+
+    async def login(i: int):
+        resp = await rec.call(client, "POST", "/login", json={"username": users[i], "password": "pw"})
+        if resp is not None and resp.status_code == 200 and "auth" not in ctx:
+            ctx["auth"] = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    await gather_limited(len(users), ctx["concurrency"], register)
+    await gather_limited(len(users), ctx["concurrency"], login)
+
+
+async def bulk_content(client: httpx.AsyncClient, rec: Recorder, ctx: dict):
+    words = ["python", "fastapi", "sqlite", "async", "cache", "index", "search", "stream", "token", "prompt"]
+
+    async def create(i: int):
+        body = " ".join(random.choice(words) for _ in range(60))
+        await rec.call(client, "POST", "/content/create", json={"title": f"doc {i}", "body": body}, headers=ctx["auth"])
+
+    await gather_limited(ctx["content_items"], ctx["concurrency"], create)
+
+
+async def large_uploads(client: httpx.AsyncClient, rec: Recorder, ctx: dict):
+    line = b"Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n"
+    payload = line * (ctx["upload_kb"] * 1024 // len(line))
+
+    async def upload(i: int):
+        files = {"file": (f"upload-{i}.txt", payload, "text/plain")}
+        await rec.call(client, "POST", "/content/upload", files=files, headers=ctx["auth"])
+
+    await gather_limited(ctx["uploads"], max(1, ctx["concurrency"] // 4), upload)
+
+
+async def search_mix(client: httpx.AsyncClient, rec: Recorder, ctx: dict):
+    hot = ["python", "sqlite", "cache"]
+
+    async def search(i: int):
+        # 80% hot queries that should hit the cache, 20% cold one-offs
+        q = random.choice(hot) if random.random() < 0.8 else f"async {uuid.uuid4().hex[:6]}"
+        await rec.call(client, "POST", "/content/search", json={"query": q})
+
+    await gather_limited(ctx["searches"], ctx["concurrency"], search)
+
+
+async def chat_sessions(client: httpx.AsyncClient, rec: Recorder, ctx: dict):
+    async def session(i: int):
+        sid = f"bench-{uuid.uuid4().hex[:8]}"
+        for turn in range(ctx["chat_turns"]):
+            await rec.call(
+                client, "POST", "/chat",
+                json={"message": f"turn {turn}: tell me about caching", "session_id": sid},
+                headers=ctx["auth"],
+            )
+        await rec.call(client, "POST", "/summarize", json={"text": "caching " * 200, "session_id": sid}, headers=ctx["auth"])
+
+    await gather_limited(ctx["chat_sessions"], ctx["concurrency"], session)
+
+
+async def list_and_analytics(client: httpx.AsyncClient, rec: Recorder, ctx: dict):
+    async def poll(i: int):
+        await rec.call(client, "GET", "/content/list")
+        await rec.call(client, "GET", "/analytics/users")
+        await rec.call(client, "GET", "/analytics/content")
+        await rec.call(client, "GET", "/system/profile")
+
+    await gather_limited(ctx["polls"], ctx["concurrency"], poll)
+
+
+# order matters: later workloads need the token and content the earlier ones create
+WORKLOADS = {
+    "auth": auth_burst,
+    "content": bulk_content,
+    "upload": large_uploads,
+    "search": search_mix,
+    "chat": chat_sessions,
+    "poll": list_and_analytics,
+}
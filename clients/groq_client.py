@@ -0,0 +1,226 @@
+import asyncio
+import json
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from app.core.config import (
+    GROQ_API_KEY,
+    GROQ_BACKOFF_BASE,
+    GROQ_BACKOFF_MAX,
+    GROQ_BASE_URL,
+    GROQ_MAX_CONNECTIONS,
+    GROQ_MAX_IN_FLIGHT,
+    GROQ_MAX_RETRIES,
+    GROQ_STUB_TOKEN_DELAY,
+    GROQ_TIMEOUT,
+)
+from app.core.metrics import LLM_CALL_SECONDS, LLM_SLOT_WAIT_SECONDS
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# what a 200 that isn't a chat completion fails with while we pick it apart
+MALFORMED = (ValueError, KeyError, IndexError, TypeError, AttributeError)
+
+
+class GroqError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StubTransport(httpx.AsyncBaseTransport):
+    """
+    Answers /chat/completions locally, echoing the last user message the way
+    the old groq_call_stub did. Used whenever GROQ_API_KEY is unset.
+    With "stream": true it emits the reply word by word as SSE chunks,
+    `token_delay` seconds apart, like a real model would.
+    """
+
+    def __init__(self, token_delay: float = GROQ_STUB_TOKEN_DELAY):
+        self.token_delay = token_delay
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(await request.aread())
+        last_user = ""
+        for m in reversed(payload.get("messages", [])):
+            if m.get("role") == "user":
+                last_user = m.get("content", "")
+                break
+        reply = f"(stubbed {payload.get('model')}) I heard you say: {last_user}"
+        if payload.get("stream"):
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=self._sse(reply))
+        return httpx.Response(200, json={"choices": [{"message": {"role": "assistant", "content": reply}}]})
+
+    async def _sse(self, reply: str) -> AsyncIterator[bytes]:
+        for i, word in enumerate(reply.split(" ")):
+            await asyncio.sleep(self.token_delay)
+            chunk = {"choices": [{"delta": {"content": word if i == 0 else " " + word}}]}
+            yield f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+        yield b"data: [DONE]\n\n"
+
+
+class GroqClient:
+    """
+    Async chat-completions client: one keep-alive connection pool per event loop
+    (rebuilt if the client is used from a new loop), at most `max_in_flight` concurrent calls, per-attempt timeouts and jittered
+    exponential backoff on 429/5xx and transport errors.
+    """
+
+    def __init__(
+        self,
+        api_key: str = GROQ_API_KEY,
+        base_url: str = GROQ_BASE_URL,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_in_flight: int = GROQ_MAX_IN_FLIGHT,
+        timeout: float = GROQ_TIMEOUT,
+        max_retries: int = GROQ_MAX_RETRIES,
+        backoff_base: float = GROQ_BACKOFF_BASE,
+        backoff_max: float = GROQ_BACKOFF_MAX,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.transport = transport if transport is not None else (None if api_key else StubTransport())
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._http: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.retries = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._loop is not loop:
+            # the pool and semaphore are bound to the loop they were first used on
+            # (tests, benchmarks run several); the old loop's pool can't be closed
+            # from this one and is left to the garbage collector
+            self._loop = loop
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else {},
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=GROQ_MAX_CONNECTIONS, max_keepalive_connections=GROQ_MAX_CONNECTIONS),
+                transport=self.transport,
+            )
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+        self._slots = None
+        self._loop = None
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # "full jitter": spread retries out so callers don't stampede together
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def chat(self, messages: List[Dict[str, str]], model: str) -> str:
+        self._ensure_started()
+        payload = {"model": model, "messages": messages}
+        start = time.perf_counter()
+        outcome = "error"
+        async with self._slots:
+            LLM_SLOT_WAIT_SECONDS.observe(time.perf_counter() - start)
+            self.in_flight += 1
+            try:
+                reply = await self._send(payload)
+                outcome = "ok"
+                return reply
+            finally:
+                self.in_flight -= 1
+                LLM_CALL_SECONDS.observe(time.perf_counter() - start, model, outcome)
+
+    async def _send(self, payload: Dict) -> str:
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                resp = await self._http.post("/chat/completions", json=payload)
+            except httpx.TransportError as e:
+                if last:
+                    raise GroqError(f"Groq request failed: {e!r}") from e
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if resp.status_code in RETRYABLE_STATUS and not last:
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, resp.headers.get("retry-after")))
+                continue
+            if resp.status_code >= 400:
+                raise GroqError(f"Groq returned {resp.status_code}", status_code=resp.status_code)
+            try:
+                return resp.json()["choices"][0]["message"]["content"]
+            except MALFORMED as e:
+                raise GroqError(f"Groq returned a malformed response: {e!r}", status_code=resp.status_code) from e
+
+    async def stream_chat(self, messages: List[Dict[str, str]], model: str) -> AsyncIterator[str]:
+        """
+        Yield reply tokens as the model produces them. Retries only happen before
+        the first token; closing the generator early (client went away) closes
+        the upstream stream and frees the slot.
+        """
+        self._ensure_started()
+        payload = {"model": model, "messages": messages, "stream": True}
+        started = False
+        start = time.perf_counter()
+        outcome = "error"
+        async with self._slots:
+            LLM_SLOT_WAIT_SECONDS.observe(time.perf_counter() - start)
+            self.in_flight += 1
+            try:
+                for attempt in range(self.max_retries + 1):
+                    last = attempt == self.max_retries
+                    try:
+                        async with self._http.stream("POST", "/chat/completions", json=payload) as resp:
+                            if resp.status_code in RETRYABLE_STATUS and not last:
+                                retry_after = resp.headers.get("retry-after")
+                            elif resp.status_code >= 400:
+                                raise GroqError(f"Groq returned {resp.status_code}", status_code=resp.status_code)
+                            else:
+                                async for token in _iter_sse_tokens(resp):
+                                    started = True
+                                    yield token
+                                outcome = "ok"
+                                return
+                    except httpx.TransportError as e:
+                        if last or started:
+                            raise GroqError(f"Groq request failed: {e!r}") from e
+                        retry_after = None
+                    self.retries += 1
+                    await asyncio.sleep(self._backoff(attempt, retry_after))
+            finally:
+                self.in_flight -= 1
+                # "error" also covers streams abandoned by the client
+                LLM_CALL_SECONDS.observe(time.perf_counter() - start, model, outcome)
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "max_in_flight": self.max_in_flight, "retries": self.retries}
+
+
+async def _iter_sse_tokens(resp: httpx.Response) -> AsyncIterator[str]:
+    async for line in resp.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+        except MALFORMED as e:
+            raise GroqError(f"Groq sent a malformed stream chunk: {e!r}", status_code=resp.status_code) from e
+        if delta:
+            yield delta
+
+
+groq_client = GroqClient()
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.core.config import LLM_CACHE_DISK_ENTRIES, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_TTL
+from app.core.state import LRUCache
+from app.data.database import get_conn
+
+_WS_RE = re.compile(r"\s+")
+
+
+def cache_key(model: str, messages: List[Dict[str, str]]) -> str:
+    """sha256 over the model and the messages with whitespace normalised."""
+    normalized = [
+        {"role": m.get("role", "").strip().lower(), "content": _WS_RE.sub(" ", m.get("content", "")).strip()}
+        for m in messages
+    ]
+    raw = json.dumps({"model": model, "messages": normalized}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two tiers in front of the LLM client: an in-process LRU and the llm_cache
+    table (survives restarts, shared by workers on the same DB). Both honour
+    LLM_CACHE_TTL; the table is pruned to LLM_CACHE_DISK_ENTRIES on write.
+    Disk methods are blocking; call them from a worker thread.
+    """
+
+    PRUNE_EVERY = 100  # writes between prunes
+
+    def __init__(self, ttl: float, memory_entries: int, disk_entries: int):
+        self.ttl = ttl
+        self.disk_entries = disk_entries
+        self.memory = LRUCache("llm_responses", memory_entries, ttl, 64 * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+    def get_memory(self, key: str) -> Optional[str]:
+        return self.memory.get(key)
+
+    def get_disk(self, key: str) -> Optional[str]:
+        with get_conn() as conn:
+            row = conn.execute(
+                "SELECT response FROM llm_cache WHERE key=? AND created_at >= ?",
+                (key, int(time.time() - self.ttl)),
+            ).fetchone()
+        with self._lock:
+            if row is None:
+                self.disk_misses += 1
+                return None
+            self.disk_hits += 1
+        self.memory.set(key, row["response"])  # promote
+        return row["response"]
+
+    def set(self, key: str, model: str, response: str):
+        self.memory.set(key, response)
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        with get_conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at) VALUES (?, ?, ?, ?)",
+                (key, model, response, int(time.time())),
+            )
+            if prune:
+                conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (int(time.time() - self.ttl),))
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_entries,),
+                )
+
+    def stats(self) -> Dict[str, object]:
+        mem = self.memory.stats()
+        lookups = mem["hits"] + self.disk_hits + self.disk_misses
+        return {
+            "memory": mem,
+            "disk_hits": self.disk_hits,
+            "disk_misses": self.disk_misses,
+            "hit_ratio": round((mem["hits"] + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+LLM_CACHE = LLMResponseCache(LLM_CACHE_TTL, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_DISK_ENTRIES)
@@ -0,0 +1,167 @@
+"""
+Admission control for LLM-backed routes.
+
+RateLimiter: per-user token bucket; an empty bucket is a 429 with Retry-After
+set to when the next token arrives.
+AdmissionGate: at most `max_concurrent` requests inside, at most `max_queue`
+waiting for a slot. A full queue, or a wait longer than `queue_timeout`, is a
+503 with Retry-After, so overload turns into fast rejections instead of every
+request getting slower together.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Tuple
+
+from fastapi import HTTPException
+
+from app.core.config import (
+    LLM_ROUTE_MAX_CONCURRENT,
+    LLM_ROUTE_MAX_QUEUE,
+    LLM_ROUTE_QUEUE_TIMEOUT,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_PER_MINUTE,
+)
+from app.core.metrics import Counter, Gauge
+
+
+class RateLimiter:
+    def __init__(self, per_minute: float, burst: int, max_keys: int):
+        self.rate = per_minute / 60.0  # tokens per second
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> (tokens, last refill); LRU so idle users age out
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        """Take one token. Returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate if self.rate > 0 else float("inf")
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self) -> Dict[str, object]:
+        return {"per_minute": self.rate * 60, "burst": self.burst, "tracked_users": len(self._buckets)}
+
+
+class Slot:
+    """One admitted request; release() is idempotent."""
+
+    def __init__(self, gate: "AdmissionGate"):
+        self._gate = gate
+        self._start = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._gate._release(time.monotonic() - self._start)
+
+
+class AdmissionGate:
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._sem = asyncio.Semaphore(max_concurrent)
+        self._loop = None
+        self.in_flight = 0
+        self.waiting = 0
+        self._avg_hold = 1.0  # EWMA of seconds a slot is held, for Retry-After
+        self.admitted = 0
+
+    def _retry_after(self) -> int:
+        # roughly how long until the current queue has drained
+        return max(1, math.ceil(self._avg_hold * (self.waiting + 1) / self.max_concurrent))
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTIONS.inc(reason)
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, retry later",
+            headers={"Retry-After": str(self._retry_after())},
+        )
+
+    async def acquire(self) -> Slot:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # a semaphore is bound to the loop it first waited on (tests, benchmarks run several)
+            self._loop, self._sem = loop, asyncio.Semaphore(self.max_concurrent)
+            self.in_flight = self.waiting = 0
+        if self._sem.locked():
+            if self.waiting >= self.max_queue:
+                self._reject("queue_full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject("queue_timeout")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._sem.acquire()
+        self.in_flight += 1
+        self.admitted += 1
+        return Slot(self)
+
+    def _release(self, held: float):
+        self.in_flight -= 1
+        self._avg_hold = 0.9 * self._avg_hold + 0.1 * held
+        self._sem.release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        s = await self.acquire()
+        try:
+            yield
+        finally:
+            s.release()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "avg_hold_seconds": round(self._avg_hold, 4),
+        }
+
+
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total", "Requests shed by admission control, by reason.", ("reason",),
+)
+
+RATE_LIMITER = RateLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST, RATE_LIMIT_MAX_KEYS)
+LLM_GATE = AdmissionGate(LLM_ROUTE_MAX_CONCURRENT, LLM_ROUTE_MAX_QUEUE, LLM_ROUTE_QUEUE_TIMEOUT)
+
+Gauge(
+    "llm_route_queue_depth", "Requests waiting for an LLM route slot.",
+    collect=lambda: [((), LLM_GATE.waiting)],
+)
+
+
+def check_rate_limit(key: str):
+    wait = RATE_LIMITER.acquire(key)
+    if wait > 0:
+        ADMISSION_REJECTIONS.inc("rate_limited")
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
@@ -1,4 +1,118 @@
 import os
 
 APP_ENV = os.getenv("APP_ENV", "dev")
-SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
\ No newline at end of file
+SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
+
+# SQLite
+DB_PATH = os.getenv("DB_PATH", "app.db")
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "5.0"))  # seconds
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "20000"))  # page cache per connection
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))  # prepared statements per connection
+
+# Shared state backend for caches, sessions and generation counters:
+# "memory" (per process) or "sqlite" (one file shared by every worker on the host)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", os.path.splitext(DB_PATH)[0] + ".state.db")
+
+# Search result cache
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))  # seconds
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Chat session history
+SESSION_MAX_RESIDENT = int(os.getenv("SESSION_MAX_RESIDENT", "1000"))  # sessions kept in memory
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "2000"))  # history tokens sent to the model
+SESSION_HISTORY_LOAD_LIMIT = int(os.getenv("SESSION_HISTORY_LOAD_LIMIT", "50"))  # rows read on rehydration
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024)))  # resident histories, JSON-sized
+
+# Chat log write-behind
+CHAT_LOG_BATCH_SIZE = int(os.getenv("CHAT_LOG_BATCH_SIZE", "200"))  # rows per group commit
+CHAT_LOG_FLUSH_INTERVAL = float(os.getenv("CHAT_LOG_FLUSH_INTERVAL", "0.05"))  # seconds
+CHAT_LOG_MAX_PENDING = int(os.getenv("CHAT_LOG_MAX_PENDING", "10000"))  # beyond this, writers flush inline
+
+# Chat log retention: rows older than this move to gzip NDJSON archives (0 disables)
+CHAT_RETENTION_DAYS = float(os.getenv("CHAT_RETENTION_DAYS", "30"))
+CHAT_ARCHIVE_DIR = os.getenv("CHAT_ARCHIVE_DIR", "archive")
+CHAT_RETENTION_INTERVAL = float(os.getenv("CHAT_RETENTION_INTERVAL", "3600"))  # seconds between runs
+CHAT_ARCHIVE_BATCH = int(os.getenv("CHAT_ARCHIVE_BATCH", "5000"))  # rows per archive file / delete transaction
+
+# Groq (OpenAI-compatible) client
+GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")  # empty -> stub transport, no network
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+GROQ_MODEL_DEFAULT = os.getenv("GROQ_MODEL_DEFAULT", "llama-3.3-70b-versatile")
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30"))  # seconds per attempt
+GROQ_MAX_IN_FLIGHT = int(os.getenv("GROQ_MAX_IN_FLIGHT", "256"))
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "100"))  # keep-alive pool size
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+GROQ_BACKOFF_BASE = float(os.getenv("GROQ_BACKOFF_BASE", "0.25"))  # seconds
+GROQ_BACKOFF_MAX = float(os.getenv("GROQ_BACKOFF_MAX", "8"))
+GROQ_STUB_TOKEN_DELAY = float(os.getenv("GROQ_STUB_TOKEN_DELAY", "0.02"))  # seconds between streamed stub tokens
+
+# Content uploads
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+PASSAGE_MAX_CHARS = int(os.getenv("PASSAGE_MAX_CHARS", "2000"))  # uploads are split into passages of this size
+
+# Background jobs (upload ingestion, index maintenance)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "1000"))  # queued jobs beyond this -> 503
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "2.0"))  # seconds, doubled per attempt
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "spool")  # uploads wait here for their ingest job
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))  # done/failed jobs kept this long (0 keeps all)
+JOB_RETENTION_INTERVAL = float(os.getenv("JOB_RETENTION_INTERVAL", "3600"))  # seconds between sweeps
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))  # a running job not renewed this long is reclaimed
+
+# Bulk NDJSON import
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))  # rows per transaction
+BULK_MAX_LINE_BYTES = int(os.getenv("BULK_MAX_LINE_BYTES", str(1024 * 1024)))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "100"))  # per-line errors echoed back; the rest are only counted
+
+# Content context block added to LLM system prompts
+CONTENT_CONTEXT_ITEMS = int(os.getenv("CONTENT_CONTEXT_ITEMS", "3"))
+CONTENT_CONTEXT_SNIPPET_CHARS = int(os.getenv("CONTENT_CONTEXT_SNIPPET_CHARS", "200"))
+
+# Retrieval index for chat context (hashed TF-IDF vectors)
+RETRIEVAL_DIM = int(os.getenv("RETRIEVAL_DIM", "1024"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.05"))  # below this, fall back to recent content
+RETRIEVAL_INDEX_PATH = os.getenv("RETRIEVAL_INDEX_PATH", os.path.splitext(DB_PATH)[0] + ".vectors.npy")
+
+# Admission control for LLM-backed routes (/chat, /chat/stream, /summarize)
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))  # per user, token-bucket refill
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # buckets kept (LRU)
+LLM_ROUTE_MAX_CONCURRENT = int(os.getenv("LLM_ROUTE_MAX_CONCURRENT", "64"))
+LLM_ROUTE_MAX_QUEUE = int(os.getenv("LLM_ROUTE_MAX_QUEUE", "128"))  # beyond this, shed with 503
+LLM_ROUTE_QUEUE_TIMEOUT = float(os.getenv("LLM_ROUTE_QUEUE_TIMEOUT", "5"))  # seconds waiting before 503
+
+# Auth tokens
+TOKEN_TTL = int(os.getenv("TOKEN_TTL", str(24 * 3600)))  # seconds after iat
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
+# Password hashing (scrypt, run in a process pool)
+SCRYPT_N = int(os.getenv("SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("SCRYPT_P", "1"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))  # queued + running jobs
+
+# On-demand request profiling (off unless PROFILING_ENABLED=1 and a token is set)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")  # send as X-Profile-Token to profile a request
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_DUMPS = int(os.getenv("PROFILE_MAX_DUMPS", "50"))
+
+# Map-reduce summarization
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))  # per map/reduce prompt
+SUMMARY_MAX_FANOUT = int(os.getenv("SUMMARY_MAX_FANOUT", "4"))  # concurrent chunk calls per request
+SUMMARY_MAX_LEVELS = int(os.getenv("SUMMARY_MAX_LEVELS", "3"))  # reduce rounds before truncating
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "4096"))
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", str(24 * 3600)))
+
+# LLM response cache (memory LRU + SQLite tier)
+LLM_CACHE_ROUTES = {r for r in os.getenv("LLM_CACHE_ROUTES", "summarize").split(",") if r}  # routes that opt in
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "2048"))
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "100000"))
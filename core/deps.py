@@ -1,9 +1,28 @@
-from fastapi import Header, HTTPException
+from fastapi import Depends, Header, HTTPException
 from typing import Optional
+from app.core.admission import LLM_GATE, check_rate_limit
+from app.core.profiling import phase
 from app.core.security import verify_token
 
-def get_current_user(authorization: Optional[str] = Header(default=None)) -> str:
+# async so FastAPI runs it inline instead of hopping to the threadpool;
+# verify_token is a cache lookup in the common case
+async def get_current_user(authorization: Optional[str] = Header(default=None)) -> str:
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing bearer token")
     token = authorization.split(" ", 1)[1]
-    return verify_token(token)
\ No newline at end of file
+    with phase("auth"):
+        return verify_token(token)
+
+async def get_rate_limited_user(username: str = Depends(get_current_user)) -> str:
+    """get_current_user plus one token from the user's bucket (429 when empty)."""
+    check_rate_limit(username)
+    return username
+
+async def llm_slot():
+    """Hold an LLM route slot for the request (503 + Retry-After when the queue is full)."""
+    with phase("admission_wait"):
+        slot = await LLM_GATE.acquire()
+    try:
+        yield
+    finally:
+        slot.release()
@@ -0,0 +1,147 @@
+"""
+Opt-in per-request profiling.
+
+With PROFILING_ENABLED=1, a request carrying `X-Profile-Token: <PROFILING_TOKEN>`
+runs under cProfile and records a per-phase timing breakdown. The dump
+(.prof for pstats/snakeviz + .json summary) goes to a bounded ring in
+PROFILE_DIR. Other requests only pay for one ContextVar lookup per phase().
+
+cProfile follows the event-loop thread, so it can include other requests
+interleaved with the profiled one; the phase timings are per request. Only one
+request is under cProfile at a time; concurrent opt-ins get phase timings only.
+"""
+
+import cProfile
+import hmac
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from fastapi import Header, HTTPException
+
+from app.core.config import PROFILE_DIR, PROFILE_MAX_DUMPS, PROFILING_ENABLED, PROFILING_TOKEN
+
+PROFILE_HEADER = b"x-profile-token"
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, with_cprofile: bool):
+        self.id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.phases: Dict[str, float] = {}
+        self.profiler = cProfile.Profile() if with_cprofile else None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - start)
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+_noop = nullcontext()
+_cprofile_busy = False
+
+
+def phase(name: str):
+    """Time a block as `name` when the current request is being profiled; no-op otherwise."""
+    profile = _current.get()
+    return _noop if profile is None else profile.phase(name)
+
+
+def _token_ok(token: Optional[str]) -> bool:
+    return bool(PROFILING_ENABLED and PROFILING_TOKEN and token and hmac.compare_digest(token, PROFILING_TOKEN))
+
+
+def _write_dump(profile: RequestProfile, status: int, duration: float):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, profile.id)
+    if profile.profiler is not None:
+        profile.profiler.dump_stats(base + ".prof")
+    meta = {
+        "id": profile.id,
+        "method": profile.method,
+        "path": profile.path,
+        "status": status,
+        "duration_ms": round(duration * 1000, 3),
+        "phases_ms": {k: round(v * 1000, 3) for k, v in profile.phases.items()},
+        "cprofile": profile.profiler is not None,
+        "created_at": int(time.time()),
+    }
+    with open(base + ".json", "w") as f:
+        json.dump(meta, f)
+
+    # ring buffer: ids sort by creation time, drop the oldest beyond the cap
+    ids = sorted(name[:-5] for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for old in ids[:-PROFILE_MAX_DUMPS] if len(ids) > PROFILE_MAX_DUMPS else []:
+        for ext in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, old + ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> List[dict]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    out = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if name.endswith(".json"):
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                out.append(json.load(f))
+    return out
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    path = os.path.join(PROFILE_DIR, os.path.basename(profile_id) + ".prof")
+    return path if os.path.isfile(path) else None
+
+
+async def require_profiling_access(x_profile_token: Optional[str] = Header(default=None)):
+    if not _token_ok(x_profile_token):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+class ProfilingMiddleware:
+    """Only added to the app when PROFILING_ENABLED is set."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = next((v.decode("latin-1") for k, v in scope["headers"] if k == PROFILE_HEADER), None)
+        if not _token_ok(token) or scope["path"].startswith("/system/profiles"):
+            return await self.app(scope, receive, send)
+
+        global _cprofile_busy
+        profile = RequestProfile(scope["method"], scope["path"], with_cprofile=not _cprofile_busy)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        reset = _current.set(profile)
+        start = time.perf_counter()
+        if profile.profiler is not None:
+            _cprofile_busy = True
+            profile.profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profile.profiler is not None:
+                profile.profiler.disable()
+                _cprofile_busy = False
+            _current.reset(reset)
+            _write_dump(profile, status["code"], time.perf_counter() - start)
@@ -1,4 +1,147 @@
+import asyncio
+import base64
 import hashlib
+import hmac
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.core.config import (
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_WORKERS,
+    SCRYPT_N,
+    SCRYPT_P,
+    SCRYPT_R,
+    SECRET_KEY,
+    TOKEN_CACHE_MAX_ENTRIES,
+    TOKEN_TTL,
+)
+from app.core.state import LRUCache
+
+log = logging.getLogger(__name__)
+
+# token -> (username, expires_at). Keyed by the whole token, not just the
+# signature, so a hit can never pair a valid signature with a different payload.
+TOKEN_CACHE = LRUCache("token", TOKEN_CACHE_MAX_ENTRIES, TOKEN_TTL, 64 * 1024 * 1024)
 
 def md5_hash(text: str) -> str:
-    return hashlib.md5(text.encode()).hexdigest()
\ No newline at end of file
+    # legacy only: still used to verify old hashes until they are migrated on login
+    return hashlib.md5(text.encode()).hexdigest()
+
+# ---------------------------
+# Password hashing
+# Stored format: scrypt$N$r$p$salt$hash (salt/hash urlsafe base64).
+# Rows written by the monolith hold a bare MD5 hex digest.
+# ---------------------------
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "==")
+
+def hash_password(password: str, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P) -> str:
+    salt = os.urandom(16)
+    dk = hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(dk)}"
+
+def verify_password(password: str, stored: str) -> bool:
+    if not stored.startswith("scrypt$"):
+        return hmac.compare_digest(md5_hash(password), stored)
+    try:
+        _, n, r, p, salt, expected = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        salt = _unb64(salt)
+    except ValueError:  # also covers a corrupt salt (binascii.Error)
+        return False
+    dk = hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024)
+    return hmac.compare_digest(_b64(dk), expected)
+
+# Verified in place of a missing user's hash, so an unknown username costs the
+# same scrypt as a wrong password. Only the salt and parameters drive the work.
+DUMMY_PASSWORD_HASH = f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(bytes(16))}${_b64(bytes(64))}"
+
+def needs_rehash(stored: str) -> bool:
+    """Legacy MD5 hashes and hashes made with other cost parameters get upgraded on login."""
+    return not stored.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+# scrypt is deliberately slow and memory hungry; run it in worker processes so
+# login storms don't hold the GIL / event loop, and cap how much work can queue up.
+# Workers come from a forkserver: forking this multi-threaded server directly
+# could copy a lock some other thread was holding into the child.
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_slots: Optional[asyncio.Semaphore] = None
+
+async def _run_hashing(fn, *args):
+    global _hash_pool, _hash_slots
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+        )
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+    async with _hash_slots:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+async def verify_password_async(password: str, stored: str) -> bool:
+    return await _run_hashing(verify_password, password, stored)
+
+async def warm_hash_pool():
+    """Start the workers now (each imports the app, ~1s) rather than on the first logins."""
+    try:
+        await asyncio.gather(*(_run_hashing(os.getpid) for _ in range(PASSWORD_HASH_WORKERS)))
+    except BrokenProcessPool:
+        # e.g. __main__ can't be re-imported by the workers; the first login reports it
+        log.warning("password hash pool failed to start", exc_info=True)
+        shutdown_hash_pool()
+
+def shutdown_hash_pool():
+    global _hash_pool, _hash_slots
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=True, cancel_futures=True)
+    _hash_pool = None
+    _hash_slots = None
+
+def sign(data: bytes) -> str:
+    sig = hmac.new(SECRET_KEY.encode("utf-8"), data, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(sig).decode("utf-8").rstrip("=")
+
+def make_token(username: str) -> str:
+    raw = json.dumps({"sub": username, "iat": int(time.time())}).encode("utf-8")
+    b64 = base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
+    return f"{b64}.{sign(raw)}"
+
+def verify_token(token: str) -> str:
+    """Returns username if valid and not expired, else raises 401."""
+    now = time.time()
+    cached = TOKEN_CACHE.get(token)
+    if cached is not None:
+        username, expires_at = cached
+        if now < expires_at:
+            return username
+
+    try:
+        b64, sig = token.split(".", 1)
+        raw = base64.urlsafe_b64decode(b64 + "==")
+        if not hmac.compare_digest(sig, sign(raw)):
+            raise HTTPException(status_code=401, detail="Invalid token signature")
+        payload = json.loads(raw.decode("utf-8"))
+        username, expires_at = payload["sub"], int(payload["iat"]) + TOKEN_TTL
+    except (json.JSONDecodeError, KeyError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Malformed token")
+
+    if now >= expires_at:
+        raise HTTPException(status_code=401, detail="Token expired")
+    TOKEN_CACHE.set(token, (username, expires_at))
+    return username
@@ -0,0 +1,64 @@
+"""
+Single-flight: concurrent callers asking for the same key share one execution.
+
+The first caller (leader) runs the work; callers that arrive while it is in
+flight wait for the same result or exception instead of repeating it. Nothing
+is remembered afterwards; caching stays the caller's job.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List, TypeVar
+
+from app.core.metrics import Counter
+
+T = TypeVar("T")
+
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total", "Single-flight calls by group and role (leader ran it, coalesced shared it).",
+    ("group", "role"),
+)
+
+GROUPS: List["_Group"] = []
+
+
+class _Group:
+    def __init__(self, name: str):
+        self.name = name
+        self.leaders = 0
+        self.coalesced = 0
+        GROUPS.append(self)
+
+    def _count(self, leader: bool):
+        if leader:
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        SINGLEFLIGHT_CALLS.inc(self.name, "leader" if leader else "coalesced")
+
+    def stats(self) -> Dict[str, int]:
+        return {"leaders": self.leaders, "coalesced": self.coalesced}
+
+
+class SingleFlight(_Group):
+    """The work runs in its own task, so a leader whose request is cancelled
+    (client went away) doesn't fail the callers sharing it. Blocking work goes
+    through run_in_threadpool inside `fn`, so waiters don't each hold a thread."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        self._count(leader)
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        self._calls.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
@@ -1,4 +1,374 @@
+"""
+Process state shared by the routers: caches and generation counters.
+
+make_cache() / make_generation() pick the backend from STATE_BACKEND:
+- "memory" (default): LRUCache / Generation, private to the process.
+- "sqlite": SQLiteCache / SQLiteGeneration in STATE_DB_PATH, shared by every
+  worker on the host, so `uvicorn --workers N` keeps one cache, one view of
+  each session and one invalidation counter instead of N diverging copies.
+Both offer the same get/set/update/clear/stats and value/bump interfaces.
+Async code goes through state_io(), which keeps the SQLite backend's blocking
+calls off the event loop (a worker holding the state DB's write lock would
+otherwise stall every request on the others).
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import (
+    SEARCH_CACHE_MAX_BYTES,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_TTL,
+    STATE_BACKEND,
+    STATE_DB_PATH,
+)
+from app.core.metrics import Gauge
+from app.data.database import ConnectionPool
+
+T = TypeVar("T")
+
 FAKE_DB = {
     "users": {"andrea": {"name": "Andrea", "role": "admin"}},
     "notes": []
-}
\ No newline at end of file
+}
+
+
+class Generation:
+    """Monotonic counter bumped on every write; caches put it in their keys."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+CACHES: List["LRUCache"] = []  # every LRUCache, for the metrics endpoint
+
+CACHE_HIT_RATIO = Gauge(
+    "cache_hit_ratio", "Hit ratio since start per in-process cache.", ("cache",),
+    collect=lambda: [((c.name,), c.stats()["hit_ratio"]) for c in CACHES],
+)
+CACHE_ENTRIES = Gauge(
+    "cache_entries", "Resident entries per in-process cache.", ("cache",),
+    collect=lambda: [((c.name,), len(c)) for c in CACHES],
+)
+
+
+class LRUCache:
+    """
+    Thread-safe LRU with a per-entry TTL and an approximate memory cap.
+    Entry size is the length of the JSON encoding, which is close enough
+    for the plain dict/list payloads we cache.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl: float, max_bytes: int):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        CACHES.append(self)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: Hashable, value: Any):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def update(self, key: Hashable, fn: Callable[[Optional[Any]], Optional[Any]]) -> Optional[Any]:
+        """
+        Atomic read-modify-write: store fn(current value or None) and return it.
+        fn returning None leaves the key absent. fn runs under the cache lock.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            current = entry[2] if entry is not None and entry[0] >= time.monotonic() else None
+            value = fn(current)
+            if value is None:
+                return None
+            size = len(json.dumps(value, default=str))
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+            return value
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "backend": "memory",
+        }
+
+
+# ---------------------------
+# SQLite backend (cross-process)
+# Tables live in their own file so cache churn stays out of the app DB's WAL.
+# ---------------------------
+_state_pool: Optional[ConnectionPool] = None
+_state_lock = threading.Lock()
+
+
+def _state_conn():
+    global _state_pool
+    if _state_pool is None:
+        with _state_lock:
+            if _state_pool is None:
+                pool = ConnectionPool(STATE_DB_PATH)
+                with pool.connection() as conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS generations (name TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID"
+                    )
+                    conn.execute(
+                        """
+                        CREATE TABLE IF NOT EXISTS cache_entries (
+                          cache TEXT NOT NULL,
+                          key TEXT NOT NULL,
+                          value TEXT NOT NULL,
+                          size INTEGER NOT NULL,
+                          expires_at REAL NOT NULL,
+                          used_at REAL NOT NULL,
+                          PRIMARY KEY (cache, key)
+                        ) WITHOUT ROWID
+                        """
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_used ON cache_entries (cache, used_at)")
+                _state_pool = pool
+    return _state_pool.connection()
+
+
+class SQLiteGeneration:
+    """Generation counter in the shared state DB; bump() is one atomic UPDATE."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @property
+    def value(self) -> int:
+        with _state_conn() as conn:
+            row = conn.execute("SELECT value FROM generations WHERE name=?", (self.name,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self) -> int:
+        with _state_conn() as conn:
+            return conn.execute(
+                "INSERT INTO generations (name, value) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1 RETURNING value",
+                (self.name,),
+            ).fetchone()[0]
+
+
+class SQLiteCache:
+    """
+    LRUCache over the shared state DB. Keys and values are stored as JSON.
+    Recency is refreshed at most once per `touch_interval` per entry (so hits
+    are reads, not writes), and the entry/byte caps are enforced every
+    `PRUNE_EVERY` writes, so both are approximate. Hit/miss counts are per process.
+    """
+
+    PRUNE_EVERY = 64
+
+    def __init__(self, name: str, max_entries: int, ttl: float, max_bytes: int, touch_interval: float = 5.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        CACHES.append(self)
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return json.dumps(key, default=str)
+
+    def _count(self, attr: str):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        k, now = self._key(key), time.time()
+        with _state_conn() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at, used_at FROM cache_entries WHERE cache=? AND key=?", (self.name, k)
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            if row["expires_at"] < now:
+                conn.execute("DELETE FROM cache_entries WHERE cache=? AND key=?", (self.name, k))
+                self._count("expirations")
+                self._count("misses")
+                return None
+            if now - row["used_at"] > self.touch_interval:
+                conn.execute("UPDATE cache_entries SET used_at=? WHERE cache=? AND key=?", (now, self.name, k))
+        self._count("hits")
+        return json.loads(row["value"])
+
+    def _put(self, conn, k: str, value: Any):
+        raw = json.dumps(value, default=str)
+        if len(raw) > self.max_bytes:
+            return
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (cache, key, value, size, expires_at, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.name, k, raw, len(raw), now + self.ttl, now),
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self._prune(conn, now)
+
+    def set(self, key: Hashable, value: Any):
+        with _state_conn() as conn:
+            self._put(conn, self._key(key), value)
+
+    def update(self, key: Hashable, fn: Callable[[Optional[Any]], Optional[Any]]) -> Optional[Any]:
+        """Atomic across processes: BEGIN IMMEDIATE holds the write lock for the read-modify-write."""
+        k = self._key(key)
+        with _state_conn() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT value FROM cache_entries WHERE cache=? AND key=? AND expires_at >= ?", (self.name, k, time.time())
+            ).fetchone()
+            value = fn(json.loads(row["value"]) if row else None)
+            if value is not None:
+                self._put(conn, k, value)
+            return value
+
+    def _prune(self, conn, now: float):
+        cur = conn.execute("DELETE FROM cache_entries WHERE cache=? AND expires_at < ?", (self.name, now))
+        with self._lock:
+            self.expirations += max(cur.rowcount, 0)
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE cache=?", (self.name,)
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # drop least recently used down to the entry cap and to ~the byte cap (by average size)
+        keep = min(self.max_entries, int(self.max_bytes / (total / count))) if count else 0
+        cur = conn.execute(
+            "DELETE FROM cache_entries WHERE cache=? AND key IN "
+            "(SELECT key FROM cache_entries WHERE cache=? ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.name, self.name, keep),
+        )
+        with self._lock:
+            self.evictions += max(cur.rowcount, 0)
+
+    def clear(self):
+        with _state_conn() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE cache=?", (self.name,))
+
+    def __len__(self) -> int:
+        with _state_conn() as conn:
+            return conn.execute("SELECT COUNT(*) FROM cache_entries WHERE cache=?", (self.name,)).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with _state_conn() as conn:
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE cache=?", (self.name,)
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "backend": "sqlite",
+        }
+
+
+def make_cache(name: str, max_entries: int, ttl: float, max_bytes: int):
+    """A cache on the configured backend. Values must be JSON-serializable for "sqlite"."""
+    if STATE_BACKEND == "sqlite":
+        return SQLiteCache(name, max_entries, ttl, max_bytes)
+    return LRUCache(name, max_entries, ttl, max_bytes)
+
+
+def make_generation(name: str):
+    if STATE_BACKEND == "sqlite":
+        return SQLiteGeneration(name)
+    return Generation()
+
+
+async def state_io(fn: Callable[..., T], *args: Any) -> T:
+    """Call fn(*args) from async code: inline on "memory", in the threadpool on "sqlite"."""
+    if STATE_BACKEND == "sqlite":
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+
+# Shared by the routers (per process or per host, depending on STATE_BACKEND)
+CONTENT_GENERATION = make_generation("content")
+SEARCH_CACHE = make_cache("search", SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_BYTES)
@@ -0,0 +1,384 @@
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from app.core.config import (
+    DB_BUSY_TIMEOUT,
+    DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE,
+    DB_PATH,
+    DB_STATEMENT_CACHE,
+)
+from app.core.metrics import DB_QUERY_SECONDS
+
+
+@lru_cache(maxsize=1024)
+def _statement_label(sql: str) -> str:
+    # SQL in this app is static text with bound parameters, so this stays low-cardinality
+    return re.sub(r"\s+", " ", sql).strip()[:120]
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Times execute/executemany per statement into sqlite_query_duration_seconds."""
+
+    def execute(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, _statement_label(sql))
+
+    def executemany(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, _statement_label(sql))
+
+
+class ConnectionPool:
+    """
+    One long-lived connection per thread instead of connect/close per helper.
+    Sync routes run on the threadpool, so each worker thread keeps its own
+    connection (and its prepared-statement cache) for as long as it lives.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns: Dict[threading.Thread, sqlite3.Connection] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT,
+            cached_statements=DB_STATEMENT_CACHE,
+            check_same_thread=False,  # we keep it thread-affine ourselves; close_all() runs elsewhere
+            factory=InstrumentedConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._prune_dead_threads()
+                self._conns[threading.current_thread()] = conn
+        return conn
+
+    def _prune_dead_threads(self):
+        # threadpool workers come and go; don't keep their connections around
+        for t in [t for t in self._conns if not t.is_alive()]:
+            self._conns.pop(t).close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Commit when the outermost block exits cleanly, roll back on error.
+        Nested blocks on the same thread share the outer transaction.
+        """
+        conn = self.acquire()
+        self._local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.rollback()
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            conn.commit()
+
+    @contextmanager
+    def dedicated(self) -> Iterator[sqlite3.Connection]:
+        """
+        A private connection outside the per-thread pool, for long reads that
+        are consumed across threads (e.g. a streamed response).
+        """
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+        self._local = threading.local()
+
+
+pool = ConnectionPool(DB_PATH)
+
+
+def get_conn():
+    return pool.connection()
+
+
+def get_dedicated_conn():
+    return pool.dedicated()
+
+
+_CONTENT_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS content_fts_ai AFTER INSERT ON content BEGIN
+      INSERT INTO content_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_fts_ad AFTER DELETE ON content BEGIN
+      INSERT INTO content_fts(content_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_fts_au AFTER UPDATE ON content BEGIN
+      INSERT INTO content_fts(content_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+      INSERT INTO content_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+)
+
+
+def _init_content_fts(conn: sqlite3.Connection):
+    # External-content FTS5 index over content(title, body), kept in sync by triggers
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='content_fts'"
+    ).fetchone()
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS content_fts USING fts5(
+          title, body,
+          content='content', content_rowid='id',
+          tokenize='unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    for stmt in _CONTENT_FTS_TRIGGERS:
+        conn.execute(stmt)
+    if not exists:
+        # existing databases: index rows written before the FTS table existed
+        conn.execute("INSERT INTO content_fts(content_fts) VALUES ('rebuild')")
+
+
+# ---------------------------
+# Analytics counters + rollups
+# counters holds running totals; rollups_minute/rollups_hour hold per-bucket
+# counts (bucket = unix time truncated to the minute/hour). Table inserts bump
+# them via triggers in the same transaction; other metrics go through
+# analytics_service.record_metric().
+# ---------------------------
+METRIC_TABLES = {"users": "registrations", "content": "content_writes", "chat_logs": "chat_messages"}
+
+UPSERT_COUNTER_SQL = (
+    "INSERT INTO counters (name, value) VALUES (?, ?) "
+    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value"
+)
+UPSERT_ROLLUP_SQL = (
+    "INSERT INTO {table} (name, bucket, value) VALUES (?, ?, ?) "
+    "ON CONFLICT(name, bucket) DO UPDATE SET value = value + excluded.value"
+)
+
+
+def _init_metrics(conn: sqlite3.Connection):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='counters'"
+    ).fetchone()
+    conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID")
+    for table in ("rollups_minute", "rollups_hour"):
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+              name TEXT NOT NULL,
+              bucket INTEGER NOT NULL,
+              value INTEGER NOT NULL,
+              PRIMARY KEY (name, bucket)
+            ) WITHOUT ROWID
+            """
+        )
+
+    for table, metric in METRIC_TABLES.items():
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS metrics_{table}_ai AFTER INSERT ON {table} BEGIN
+              INSERT INTO counters (name, value) VALUES ('{metric}', 1)
+                ON CONFLICT(name) DO UPDATE SET value = value + 1;
+              INSERT INTO rollups_minute (name, bucket, value) VALUES ('{metric}', new.created_at / 60 * 60, 1)
+                ON CONFLICT(name, bucket) DO UPDATE SET value = value + 1;
+              INSERT INTO rollups_hour (name, bucket, value) VALUES ('{metric}', new.created_at / 3600 * 3600, 1)
+                ON CONFLICT(name, bucket) DO UPDATE SET value = value + 1;
+            END
+            """
+        )
+
+    if not exists:
+        # existing databases: seed totals and buckets from the rows already there
+        for table, metric in METRIC_TABLES.items():
+            conn.execute(f"INSERT INTO counters (name, value) SELECT '{metric}', COUNT(*) FROM {table}")
+            for rollup, width in (("rollups_minute", 60), ("rollups_hour", 3600)):
+                conn.execute(
+                    f"INSERT INTO {rollup} (name, bucket, value) "
+                    f"SELECT '{metric}', created_at / {width} * {width} AS b, COUNT(*) FROM {table} GROUP BY b"
+                )
+
+
+# ---------------------------
+# Schema migrations
+# Each migration runs once, in its own BEGIN IMMEDIATE transaction, and is
+# recorded in schema_migrations. Append new ones; never edit applied ones.
+# ---------------------------
+def _migration_baseline(conn: sqlite3.Connection):
+    # IF NOT EXISTS throughout: databases created before the runner existed
+    # already have these and are simply stamped at version 1
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          username TEXT UNIQUE NOT NULL,
+          password_hash TEXT NOT NULL,
+          created_at INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS content (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          title TEXT NOT NULL,
+          body TEXT NOT NULL,
+          created_at INTEGER NOT NULL
+        )
+        """
+    )
+    _init_content_fts(conn)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_logs (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          session_id TEXT NOT NULL,
+          role TEXT NOT NULL,
+          content TEXT NOT NULL,
+          created_at INTEGER NOT NULL
+        )
+        """
+    )
+    _init_metrics(conn)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+          key TEXT PRIMARY KEY,
+          model TEXT NOT NULL,
+          response TEXT NOT NULL,
+          created_at INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache (created_at)")
+
+
+def _migration_history_indexes(conn: sqlite3.Connection):
+    # load_chat_from_db: WHERE session_id=? ORDER BY id DESC LIMIT n -> index range scan, no sort
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_logs_session_id ON chat_logs (session_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_content_created_at ON content (created_at)")
+    conn.execute("ANALYZE")
+
+
+def _migration_jobs(conn: sqlite3.Connection):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          kind TEXT NOT NULL,
+          payload TEXT NOT NULL,
+          status TEXT NOT NULL,
+          attempts INTEGER NOT NULL DEFAULT 0,
+          result TEXT,
+          error TEXT,
+          owner TEXT,
+          lease_until REAL,
+          created_at INTEGER NOT NULL,
+          updated_at INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)")
+    # lease reclaim: WHERE status='running' AND lease_until < ?
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_lease ON jobs (status, lease_until)")
+    # retention sweep: WHERE status IN ('done', 'failed') AND updated_at < ?
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_updated ON jobs (status, updated_at)")
+    # one row per ingested upload job, written in the ingest transaction, so a rerun
+    # of the same job (at-least-once delivery) can tell its passages already landed
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS upload_ingests (
+          job_id INTEGER PRIMARY KEY,
+          passages INTEGER NOT NULL,
+          created_at INTEGER NOT NULL
+        )
+        """
+    )
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "baseline", _migration_baseline),
+    (2, "history_indexes", _migration_history_indexes),
+    (3, "jobs", _migration_jobs),
+]
+
+
+def migrate(conn: sqlite3.Connection) -> List[int]:
+    """Apply pending migrations in order. Returns the versions applied by this call."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version INTEGER PRIMARY KEY,
+          name TEXT NOT NULL,
+          applied_at INTEGER NOT NULL
+        )
+        """
+    )
+    applied = []
+    for version, name, apply in MIGRATIONS:
+        if conn.in_transaction:
+            conn.commit()
+        # IMMEDIATE takes the write lock up front, so two workers starting
+        # together can't both apply the same migration
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM schema_migrations WHERE version=?", (version,)).fetchone() is None:
+                apply(conn)
+                conn.execute(
+                    "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                    (version, name, int(time.time())),
+                )
+                applied.append(version)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return applied
+
+
+def schema_version() -> int:
+    with get_conn() as conn:
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()[0]
+
+
+def init_db():
+    with get_conn() as conn:
+        migrate(conn)
@@ -0,0 +1,51 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.data.database import UPSERT_COUNTER_SQL, UPSERT_ROLLUP_SQL, get_conn
+
+METRICS = ("registrations", "content_writes", "chat_messages", "llm_calls")
+RESOLUTIONS = {"minute": ("rollups_minute", 60), "hour": ("rollups_hour", 3600)}
+
+MetricDeltas = Dict[Tuple[str, int], int]  # (metric, minute bucket) -> count
+
+
+def apply_metric_deltas(conn, deltas: MetricDeltas):
+    """Fold accumulated metric events into counters and rollups on an open transaction."""
+    if not deltas:
+        return
+    totals: Dict[str, int] = {}
+    hours: Dict[Tuple[str, int], int] = {}
+    for (name, minute), n in deltas.items():
+        totals[name] = totals.get(name, 0) + n
+        hour = minute // 3600 * 3600
+        hours[(name, hour)] = hours.get((name, hour), 0) + n
+    conn.executemany(UPSERT_COUNTER_SQL, list(totals.items()))
+    conn.executemany(UPSERT_ROLLUP_SQL.format(table="rollups_minute"), [(k[0], k[1], n) for k, n in deltas.items()])
+    conn.executemany(UPSERT_ROLLUP_SQL.format(table="rollups_hour"), [(k[0], k[1], n) for k, n in hours.items()])
+
+
+def get_counter(name: str) -> int:
+    with get_conn() as conn:
+        row = conn.execute("SELECT value FROM counters WHERE name=?", (name,)).fetchone()
+    return row["value"] if row else 0
+
+
+def get_counters() -> Dict[str, int]:
+    with get_conn() as conn:
+        rows = conn.execute("SELECT name, value FROM counters").fetchall()
+    counters = {m: 0 for m in METRICS}
+    counters.update({r["name"]: r["value"] for r in rows})
+    return counters
+
+
+def get_series(metric: str, resolution: str, start: Optional[int] = None, end: Optional[int] = None) -> List[Dict[str, int]]:
+    """Per-bucket counts in [start, end); reads only the rollup rows in range."""
+    table, width = RESOLUTIONS[resolution]
+    end = end if end is not None else int(time.time()) + width
+    start = start if start is not None else end - 60 * width
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"SELECT bucket, value FROM {table} WHERE name=? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (metric, start // width * width, end),
+        ).fetchall()
+    return [{"t": r["bucket"], "value": r["value"]} for r in rows]
@@ -0,0 +1,270 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import (
+    CHAT_LOG_BATCH_SIZE,
+    CHAT_LOG_FLUSH_INTERVAL,
+    CHAT_LOG_MAX_PENDING,
+    SESSION_HISTORY_LOAD_LIMIT,
+    SESSION_MAX_BYTES,
+    SESSION_MAX_RESIDENT,
+    SESSION_TOKEN_BUDGET,
+)
+from app.core.metrics import Counter, Gauge
+from app.core.state import make_cache
+from app.data.database import get_conn
+from app.services.analytics_service import MetricDeltas, apply_metric_deltas
+
+log = logging.getLogger(__name__)
+
+CHAT_LOG_RETRY_MAX = 5.0  # seconds; cap on the writer's backoff after a failed batch
+
+ChatLogRow = Tuple[str, str, str, int]  # (session_id, role, content, created_at)
+
+
+class ChatLogWriter:
+    """
+    Write-behind queue for chat_logs. Rows are group-committed with executemany
+    by a background thread once CHAT_LOG_BATCH_SIZE rows are queued or
+    CHAT_LOG_FLUSH_INTERVAL has passed. stop() flushes everything (app shutdown).
+    When the thread isn't running, enqueue() writes through immediately.
+    Metric events that have no table row (e.g. LLM calls) ride along in the
+    same group commit via record_metric().
+
+    A batch that fails to commit goes back to the front of the queue and is
+    retried with exponential backoff. Only if the backlog then grows past twice
+    `max_pending` are the oldest rows dropped, and counted in stats().
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: List[ChatLogRow] = []
+        self._metrics: MetricDeltas = {}
+        self._inflight: Set[str] = set()  # sessions in the batch currently being written
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # serializes batches so flush() means "all committed"
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.batches = 0
+        self.rows = 0
+        self.failed_batches = 0
+        self.dropped = 0
+        self._failures = 0  # consecutive, drives the backoff
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+        try:
+            self.flush()
+        except Exception:
+            with self._cond:
+                lost, self._pending = len(self._pending), []
+                self.dropped += lost
+            CHAT_LOG_DROPPED_ROWS.inc(amount=lost)
+            log.exception("chat log writer: final flush failed, %d rows lost", lost)
+
+    def enqueue(self, session_id: str, role: str, content: str):
+        with self._cond:
+            self._pending.append((session_id, role, content, int(time.time())))
+            backlog = len(self._pending)
+            if backlog >= self.batch_size:
+                self._cond.notify()
+        if self._thread is None or backlog >= self.max_pending:
+            self.flush()
+
+    def record_metric(self, name: str, n: int = 1):
+        key = (name, int(time.time()) // 60 * 60)
+        with self._cond:
+            self._metrics[key] = self._metrics.get(key, 0) + n
+        if self._thread is None:
+            self.flush()
+
+    def has_pending(self, session_id: str) -> bool:
+        with self._cond:
+            return session_id in self._inflight or any(r[0] == session_id for r in self._pending)
+
+    def flush(self):
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+                metrics, self._metrics = self._metrics, {}
+                self._inflight = {r[0] for r in batch}
+            try:
+                if batch or metrics:
+                    self._write(batch, metrics)
+            except Exception:
+                self._requeue(batch, metrics)
+                raise
+            finally:
+                with self._cond:
+                    self._inflight = set()
+
+    def _requeue(self, batch: List[ChatLogRow], metrics: MetricDeltas):
+        """Put a failed batch back in front of anything queued since."""
+        with self._cond:
+            self._pending = batch + self._pending
+            for key, n in metrics.items():
+                self._metrics[key] = self._metrics.get(key, 0) + n
+            overflow = len(self._pending) - 2 * self.max_pending
+            if overflow > 0:
+                del self._pending[:overflow]
+                self.dropped += overflow
+            self.failed_batches += 1
+        CHAT_LOG_WRITE_FAILURES.inc()
+        if overflow > 0:
+            CHAT_LOG_DROPPED_ROWS.inc(amount=overflow)
+
+    def _write(self, batch: List[ChatLogRow], metrics: MetricDeltas):
+        with get_conn() as conn:
+            conn.executemany(
+                "INSERT INTO chat_logs (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                batch,
+            )
+            apply_metric_deltas(conn, metrics)
+        self.batches += 1
+        self.rows += len(batch)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._failures:
+                    self._cond.wait(min(CHAT_LOG_RETRY_MAX, self.flush_interval * 2 ** self._failures))
+                elif not self._stopping and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            try:
+                self.flush()
+                self._failures = 0
+            except Exception:
+                # the batch was re-queued; keep the writer alive and retry after a backoff
+                self._failures += 1
+                log.exception("chat log writer: batch failed (%d in a row), will retry", self._failures)
+            if stopping:
+                return
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "batches": self.batches,
+            "rows": self.rows,
+            "failed_batches": self.failed_batches,
+            "dropped": self.dropped,
+        }
+
+
+CHAT_LOG_WRITE_FAILURES = Counter("chat_log_write_failures_total", "Chat log batches that failed to commit and were re-queued.")
+CHAT_LOG_DROPPED_ROWS = Counter("chat_log_dropped_rows_total", "Chat log rows dropped after the write-behind backlog overflowed.")
+
+CHAT_LOG_WRITER = ChatLogWriter(CHAT_LOG_BATCH_SIZE, CHAT_LOG_FLUSH_INTERVAL, CHAT_LOG_MAX_PENDING)
+
+Gauge(
+    "chat_log_pending_rows", "Chat log rows queued for the write-behind writer.",
+    collect=lambda: [((), CHAT_LOG_WRITER.stats()["pending"])],
+)
+
+
+def save_chat_to_db(session_id: str, role: str, content: str):
+    CHAT_LOG_WRITER.enqueue(session_id, role, content)
+
+
+def load_chat_from_db(session_id: str, limit: int = 20) -> List[Dict[str, str]]:
+    # read-your-writes: make sure this session's queued rows are committed first
+    if CHAT_LOG_WRITER.has_pending(session_id):
+        CHAT_LOG_WRITER.flush()
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT role, content FROM chat_logs WHERE session_id=? ORDER BY id DESC LIMIT ?",
+            (session_id, limit),
+        ).fetchall()
+    # reverse to restore chronological order
+    return [{"role": r["role"], "content": r["content"]} for r in reversed(rows)]
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 chars per token is close enough for budgeting; no tokenizer dependency
+    return len(text) // 4 + 1
+
+
+def trim_to_budget(messages: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+    """Keep the newest messages whose combined token estimate fits in the budget."""
+    kept = []
+    total = 0
+    for m in reversed(messages):
+        total += estimate_tokens(m["content"])
+        if total > budget:
+            break
+        kept.append(m)
+    kept.reverse()
+    return kept
+
+
+class SessionStore:
+    """
+    LRU of resident session histories, each trimmed to a token-budget window.
+    Every message is written through to chat_logs, so evicting a session just
+    drops it from the cache; the next request rehydrates it from the DB.
+    Histories live in a state-backend cache, so with STATE_BACKEND=sqlite every
+    worker sees the same window for a session.
+    """
+
+    def __init__(self, max_sessions: int, token_budget: int, max_bytes: int):
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self._sessions = make_cache("sessions", max_sessions, float("inf"), max_bytes)
+        self.rehydrations = 0
+
+    def get(self, session_id: str) -> List[Dict[str, str]]:
+        """Return a copy of the session's history window, loading it from the DB if needed."""
+        history = self._sessions.get(session_id)
+        if history is not None:
+            return list(history)
+
+        loaded = trim_to_budget(load_chat_from_db(session_id, SESSION_HISTORY_LOAD_LIMIT), self.token_budget)
+        self.rehydrations += 1
+        # another request (or worker) may have populated it meanwhile; keep theirs
+        history = self._sessions.update(session_id, lambda current: loaded if current is None else current)
+        return list(history)
+
+    def append(self, session_id: str, role: str, content: str):
+        save_chat_to_db(session_id, role, content)
+
+        def add(history: Optional[List[Dict[str, str]]]) -> Optional[List[Dict[str, str]]]:
+            if history is None:
+                return None  # not resident (evicted meanwhile); the DB already has the message
+            history.append({"role": role, "content": content})
+            return trim_to_budget(history, self.token_budget)
+
+        self._sessions.update(session_id, add)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, int]:
+        cache = self._sessions.stats()
+        return {
+            "resident": cache["entries"],
+            "max_resident": self.max_sessions,
+            "evictions": cache["evictions"],
+            "rehydrations": self.rehydrations,
+        }
+
+
+SESSION_STORE = SessionStore(SESSION_MAX_RESIDENT, SESSION_TOKEN_BUDGET, SESSION_MAX_BYTES)
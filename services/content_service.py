@@ -0,0 +1,303 @@
+import codecs
+import json
+import os
+import re
+import time
+import uuid
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import (
+    CONTENT_CONTEXT_ITEMS,
+    CONTENT_CONTEXT_SNIPPET_CHARS,
+    JOB_SPOOL_DIR,
+    PASSAGE_MAX_CHARS,
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_MAX_BYTES,
+)
+from app.core.singleflight import SingleFlight
+from app.core.state import CONTENT_GENERATION, state_io
+from app.data.database import get_conn, get_dedicated_conn
+from app.services.job_service import JOB_QUEUE
+from app.services.retrieval_service import RETRIEVAL_SYNCER, sync_retrieval_index
+
+
+def create_content(title: str, body: str) -> int:
+    with get_conn() as conn:
+        cur = conn.execute(
+            "INSERT INTO content (title, body, created_at) VALUES (?, ?, ?)",
+            (title.strip(), body.strip(), int(time.time())),
+        )
+    CONTENT_GENERATION.bump()
+    RETRIEVAL_SYNCER.request()
+    return cur.lastrowid
+
+
+def bulk_create_content(rows: List[Tuple[str, str]]) -> int:
+    """
+    Insert a batch of (title, body) in one transaction. Rows are executemany'd
+    into a per-connection TEMP staging table and moved with one INSERT ... SELECT:
+    the FTS trigger then runs inside a single statement, ~5x faster than firing
+    it from each executemany step. The generation bump and the retrieval-index
+    sync request happen once for the whole batch.
+    """
+    if not rows:
+        return 0
+    now = int(time.time())
+    with get_conn() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS content_stage (title TEXT, body TEXT, created_at INTEGER)")
+        conn.executemany(
+            "INSERT INTO content_stage (title, body, created_at) VALUES (?, ?, ?)",
+            [(title.strip(), body.strip(), now) for title, body in rows],
+        )
+        cur = conn.execute(
+            "INSERT INTO content (title, body, created_at) SELECT title, body, created_at FROM content_stage"
+        )
+        conn.execute("DELETE FROM content_stage")
+    CONTENT_GENERATION.bump()
+    RETRIEVAL_SYNCER.request()
+    return cur.rowcount
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _split_passages(chunks: Iterator[str], max_chars: int) -> Iterator[str]:
+    """Re-chunk a text stream into passages, preferring paragraph then word boundaries."""
+    buf = ""
+    for text in chunks:
+        buf += text
+        while len(buf) >= max_chars:
+            window = buf[:max_chars]
+            cut = window.rfind("\n\n")
+            if cut < max_chars // 2:
+                cut = window.rfind(" ")
+            if cut < max_chars // 2:
+                cut = max_chars
+            passage, buf = buf[:cut].strip(), buf[cut:]
+            if passage:
+                yield passage
+    if buf.strip():
+        yield buf.strip()
+
+
+def _read_text(f: BinaryIO, max_bytes: int, chunk_size: int) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    total = 0
+    while True:
+        raw = f.read(chunk_size)
+        if not raw:
+            break
+        total += len(raw)
+        if total > max_bytes:
+            raise UploadTooLarge(f"upload exceeds {max_bytes} bytes")
+        yield decoder.decode(raw)
+    yield decoder.decode(b"", final=True)
+
+
+def ingest_upload(f: BinaryIO, title: str, job_id: Optional[int] = None) -> int:
+    """
+    Stream a file into the content store: read in UPLOAD_CHUNK_SIZE chunks,
+    decode incrementally and insert each passage as it is produced, all in one
+    transaction (the FTS triggers index them in that same transaction).
+    Memory stays O(chunk + passage) whatever the file size. Returns the passage count.
+    With a `job_id` the ingest is recorded in upload_ingests in that same
+    transaction; see ingested_passages().
+    """
+    now = int(time.time())
+    n = 0
+    with get_conn() as conn:
+        for passage in _split_passages(_read_text(f, UPLOAD_MAX_BYTES, UPLOAD_CHUNK_SIZE), PASSAGE_MAX_CHARS):
+            n += 1
+            conn.execute(
+                "INSERT INTO content (title, body, created_at) VALUES (?, ?, ?)",
+                (title if n == 1 else f"{title} (part {n})", passage, now),
+            )
+        if job_id is not None:
+            conn.execute(
+                "INSERT INTO upload_ingests (job_id, passages, created_at) VALUES (?, ?, ?)", (job_id, n, now)
+            )
+    if n:
+        CONTENT_GENERATION.bump()
+        # embedded after commit, re-read in batches so memory stays bounded
+        sync_retrieval_index()
+    return n
+
+
+def ingested_passages(job_id: int) -> Optional[int]:
+    """Passage count if upload job `job_id` has already committed its ingest, else None."""
+    with get_conn() as conn:
+        row = conn.execute("SELECT passages FROM upload_ingests WHERE job_id=?", (job_id,)).fetchone()
+    return row[0] if row else None
+
+
+# ---------------------------
+# Background jobs
+# Uploads are spooled to disk and ingested by a worker; create/bulk hand the
+# (comparatively slow) embedding of new rows to RETRIEVAL_SYNCER.
+# ---------------------------
+def spool_upload(f: BinaryIO) -> str:
+    """Copy an upload to JOB_SPOOL_DIR in chunks, enforcing UPLOAD_MAX_BYTES. Returns the spool path."""
+    os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(JOB_SPOOL_DIR, f"{uuid.uuid4().hex}.upload")
+    total = 0
+    try:
+        with open(path, "wb") as out:
+            while True:
+                chunk = f.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > UPLOAD_MAX_BYTES:
+                    raise UploadTooLarge(f"upload exceeds {UPLOAD_MAX_BYTES} bytes")
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())  # the job record outlives this process; so must the file
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def submit_upload(f: BinaryIO, title: str) -> int:
+    path = spool_upload(f)
+    try:
+        return JOB_QUEUE.submit("ingest_upload", {"path": path, "title": title})
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def _remove_spool_file(payload: Dict[str, Any]):
+    if os.path.exists(payload["path"]):
+        os.remove(payload["path"])
+
+
+@JOB_QUEUE.handler("ingest_upload", cleanup=_remove_spool_file)
+def _ingest_upload_job(job_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    # a rerun after a crash between the ingest commit and the job update finds
+    # the upload_ingests row and only finishes the cleanup
+    passages = ingested_passages(job_id)
+    if passages is None:
+        with open(payload["path"], "rb") as f:
+            passages = ingest_upload(f, payload["title"], job_id)
+    _remove_spool_file(payload)
+    return {"title": payload["title"], "passages": passages}
+
+
+def list_content(limit: int, before_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Keyset page of content, newest first. Returns (items, next_cursor)."""
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT id, title, created_at FROM content WHERE id < ? ORDER BY id DESC LIMIT ?",
+            (before_id if before_id is not None else 2 ** 63 - 1, limit + 1),
+        ).fetchall()
+    items = [dict(r) for r in rows[:limit]]
+    next_cursor = items[-1]["id"] if len(rows) > limit else None
+    return items, next_cursor
+
+
+def iter_content_ndjson(before_id: Optional[int] = None, limit: Optional[int] = None, batch: int = 500) -> Iterator[str]:
+    """Stream content rows as NDJSON straight off a cursor, `batch` rows at a time."""
+    sql = "SELECT id, title, created_at FROM content WHERE id < ? ORDER BY id DESC"
+    params: List[Any] = [before_id if before_id is not None else 2 ** 63 - 1]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    # dedicated connection: the response iterator may resume on any worker thread
+    with get_dedicated_conn() as conn:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            yield "".join(json.dumps(dict(r)) + "\n" for r in rows)
+
+
+_QUERY_TOKEN_RE = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def to_fts_query(q: str) -> str:
+    """
+    Turn user input into a safe FTS5 MATCH expression.
+    "quoted text" is a phrase, a trailing * makes a prefix term, everything else is AND-ed.
+    """
+    parts = []
+    for phrase, word in _QUERY_TOKEN_RE.findall(q):
+        if phrase:
+            parts.append('"' + phrase + '"')
+            continue
+        prefix = word.endswith("*")
+        word = word.replace('"', "").rstrip("*")
+        if word:
+            parts.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(parts)
+
+
+def search_content(q: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    match = to_fts_query(q)
+    if not match:
+        return []
+    with get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT c.id, c.title,
+                   snippet(content_fts, 1, '', '', '...', 16) AS preview,
+                   bm25(content_fts, 10.0, 1.0) AS score
+            FROM content_fts
+            JOIN content c ON c.id = content_fts.rowid
+            WHERE content_fts MATCH ?
+            ORDER BY score
+            LIMIT ? OFFSET ?
+            """,
+            (match, limit, offset),
+        ).fetchall()
+    return [{"id": r["id"], "title": r["title"], "preview": r["preview"], "score": -r["score"]} for r in rows]
+
+
+def get_recent_content_context(limit: int = 3, snippet_chars: int = 200) -> str:
+    with get_conn() as conn:
+        rows = conn.execute("SELECT title, body FROM content ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+    if not rows:
+        return "No content available yet."
+    return "\n".join(f"- {r['title']}: {r['body'][:snippet_chars]}" for r in rows)
+
+
+class ContentContext:
+    """
+    Materialized context block for LLM prompts. It is rebuilt only when the
+    content generation moves (create/upload), so steady-state reads are a
+    string lookup with no DB round trip; the rebuild query runs in the threadpool.
+    """
+
+    def __init__(self, limit: int, snippet_chars: int):
+        self.limit = limit
+        self.snippet_chars = snippet_chars
+        self._block: Optional[str] = None
+        self._generation = -1
+        self._flight = SingleFlight("content_context")
+        self.rebuilds = 0
+
+    async def get(self) -> str:
+        gen = await state_io(lambda: CONTENT_GENERATION.value)
+        if self._generation == gen:
+            return self._block
+        # requests that see the same new generation share one rebuild
+        return await self._flight.do(gen, lambda: run_in_threadpool(self._rebuild, gen))
+
+    def _rebuild(self, gen: int) -> str:
+        block = get_recent_content_context(self.limit, self.snippet_chars)
+        if gen >= self._generation:
+            self._block, self._generation = block, gen
+        self.rebuilds += 1
+        return block
+
+
+CONTENT_CONTEXT = ContentContext(CONTENT_CONTEXT_ITEMS, CONTENT_CONTEXT_SNIPPET_CHARS)
+
+
+async def get_content_context() -> str:
+    return await CONTENT_CONTEXT.get()
@@ -0,0 +1,349 @@
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.core.config import (
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_QUEUE_MAX,
+    JOB_RETENTION_HOURS,
+    JOB_RETENTION_INTERVAL,
+    JOB_RETRY_BACKOFF,
+    JOB_WORKERS,
+)
+from app.data.database import get_conn
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[int, Dict[str, Any]], Optional[Dict[str, Any]]]  # (job id, payload) -> result
+Cleanup = Callable[[Dict[str, Any]], None]
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    In-process background jobs backed by the `jobs` table.
+
+    submit() records the job and hands its id to a bounded queue drained by
+    `workers` threads. A failed attempt is retried after JOB_RETRY_BACKOFF * 2^n
+    seconds, up to `max_attempts`, then marked failed.
+
+    A running job carries its queue's `owner` id and a lease that a heartbeat
+    renews every lease_seconds / 3. Every queue (one per worker process) reclaims
+    running jobs whose lease expired, i.e. whose process died mid-attempt, and
+    start() also picks up anything left queued, so jobs survive a restart without
+    a live worker's job being run twice. Delivery is still at-least-once: a crash
+    between a handler's commit and the status update reruns it, so handlers must
+    be idempotent (they get the job id to key that on). A kind's `cleanup(payload)` runs once its job has
+    finally failed, e.g. to delete files the job owned.
+
+    Finished rows (done or failed) are deleted once they are older than
+    `retention_hours`, by a sweep every `retention_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        max_attempts: int,
+        backoff: float,
+        retention_hours: float = JOB_RETENTION_HOURS,
+        retention_interval: float = JOB_RETENTION_INTERVAL,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.retention_hours = retention_hours
+        self.retention_interval = retention_interval
+        self.lease_seconds = lease_seconds
+        self.owner = self._new_owner()
+        self._queue: "queue.Queue[int]" = queue.Queue(maxsize=max_queue)
+        self._handlers: Dict[str, Handler] = {}
+        self._cleanups: Dict[str, Cleanup] = {}
+        self._threads: List[threading.Thread] = []
+        self._sweeper: Optional[threading.Thread] = None
+        self._leaser: Optional[threading.Thread] = None
+        self._timers: Set[threading.Timer] = set()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.pruned = 0
+        self.reclaimed = 0
+        self.errors = 0  # worker, sweep and lease bookkeeping that raised
+        self.cleanup_failures = 0
+
+    @staticmethod
+    def _new_owner() -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def handler(self, kind: str, cleanup: Optional[Cleanup] = None):
+        def register(fn: Handler) -> Handler:
+            self._handlers[kind] = fn
+            if cleanup is not None:
+                self._cleanups[kind] = cleanup
+            return fn
+        return register
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> int:
+        if kind not in self._handlers:
+            raise ValueError(f"no handler for job kind {kind!r}")
+        if self._queue.full():
+            raise JobQueueFull("job queue is full")
+        now = int(time.time())
+        with get_conn() as conn:
+            job_id = conn.execute(
+                "INSERT INTO jobs (kind, payload, status, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?)",
+                (kind, json.dumps(payload), now, now),
+            ).lastrowid
+        if self._threads:
+            try:
+                self._queue.put_nowait(job_id)
+            except queue.Full:
+                # lost the race for the last slot; don't leave an orphan behind
+                with get_conn() as conn:
+                    conn.execute("DELETE FROM jobs WHERE id=?", (job_id,))
+                raise JobQueueFull("job queue is full")
+        else:
+            self._run(job_id)  # no workers (scripts, tests): run inline
+        return job_id
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with get_conn() as conn:
+            row = conn.execute(
+                "SELECT id, kind, status, attempts, result, error, created_at, updated_at FROM jobs WHERE id=?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        self.owner = self._new_owner()  # not inherited across a fork
+        self.reclaim()
+        with get_conn() as conn:
+            pending = [r[0] for r in conn.execute("SELECT id FROM jobs WHERE status='queued' ORDER BY id")]
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        if self.retention_hours > 0:
+            self._sweeper = threading.Thread(target=self._sweep, name="job-retention", daemon=True)
+            self._sweeper.start()
+        self._leaser = threading.Thread(target=self._lease, name="job-lease", daemon=True)
+        self._leaser.start()
+        if pending:
+            # backlog may exceed the queue bound; feed it as workers drain it
+            threading.Thread(target=self._enqueue_all, args=(pending,), name="job-resume", daemon=True).start()
+
+    def stop(self):
+        """Let workers finish their current job; anything still queued resumes on the next start()."""
+        if not self._threads:
+            return
+        self._stop.set()
+        with self._lock:
+            for timer in self._timers:
+                timer.cancel()
+            self._timers.clear()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+        self._leaser.join()
+        self._leaser = None
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def _sweep(self):
+        while not self._stop.is_set():
+            try:
+                self.prune()
+            except Exception:
+                self._error("retention sweep failed, will retry in %ss", self.retention_interval)
+            self._stop.wait(self.retention_interval)
+
+    def _lease(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.renew()
+                for job_id in self.reclaim():
+                    self._enqueue(job_id)
+            except Exception:
+                self._error("lease renewal or reclaim failed, will retry next beat")
+
+    def renew(self, now: Optional[float] = None):
+        """Extend the lease of every job this queue is running."""
+        with get_conn() as conn:
+            conn.execute(
+                "UPDATE jobs SET lease_until=? WHERE status='running' AND owner=?",
+                ((now or time.time()) + self.lease_seconds, self.owner),
+            )
+
+    def reclaim(self, now: Optional[float] = None) -> List[int]:
+        """Re-queue running jobs whose lease has expired. Returns their ids."""
+        with get_conn() as conn:
+            ids = [
+                r[0]
+                for r in conn.execute(
+                    "UPDATE jobs SET status='queued', owner=NULL, lease_until=NULL "
+                    "WHERE status='running' AND (lease_until IS NULL OR lease_until < ?) RETURNING id",
+                    (now or time.time(),),
+                )
+            ]
+        with self._lock:
+            self.reclaimed += len(ids)
+        return ids
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete done/failed jobs last updated more than `retention_hours` ago. Returns rows deleted."""
+        cutoff = int((now or time.time()) - self.retention_hours * 3600)
+        with get_conn() as conn:
+            n = conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,)
+            ).rowcount
+        with self._lock:
+            self.pruned += n
+        return n
+
+    def _enqueue_all(self, job_ids: List[int]):
+        for job_id in job_ids:
+            self._enqueue(job_id)
+
+    def _enqueue(self, job_id: int):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(job_id, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job_id = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._run(job_id)
+            except Exception:
+                # bookkeeping failed (e.g. DB locked); a queued row resumes on the next
+                # start(), a running one is reclaimed once its lease expires
+                self._error("bookkeeping for job %d failed", job_id)
+
+    def _error(self, msg: str, *args):
+        with self._lock:
+            self.errors += 1
+        log.exception("job queue: " + msg, *args)
+
+    def _run(self, job_id: int):
+        now = time.time()
+        with get_conn() as conn:
+            # the status guard makes a duplicate delivery (resume + retry) a no-op
+            row = conn.execute(
+                "UPDATE jobs SET status='running', owner=?, lease_until=?, attempts=attempts+1, updated_at=? "
+                "WHERE id=? AND status='queued' RETURNING kind, payload, attempts",
+                (self.owner, now + self.lease_seconds, int(now), job_id),
+            ).fetchone()
+        if row is None:
+            return
+        with self._lock:
+            self.running += 1
+        try:
+            handler = self._handlers.get(row["kind"])
+            if handler is None:
+                raise LookupError(f"no handler for job kind {row['kind']!r}")
+            result = handler(job_id, json.loads(row["payload"]))
+        except Exception as e:
+            self._failed(job_id, row["kind"], row["payload"], row["attempts"], f"{type(e).__name__}: {e}")
+        else:
+            with get_conn() as conn:
+                # a lost lease means another queue has re-run, or is re-running, the job
+                done = conn.execute(
+                    "UPDATE jobs SET status='done', result=?, error=NULL, owner=NULL, lease_until=NULL, updated_at=? "
+                    "WHERE id=? AND status='running' AND owner=?",
+                    (json.dumps(result), int(time.time()), job_id, self.owner),
+                ).rowcount
+            if done:
+                with self._lock:
+                    self.completed += 1
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _failed(self, job_id: int, kind: str, payload: str, attempts: int, error: str):
+        # stopping: leave it queued for the next start() rather than burning an attempt
+        final = attempts >= self.max_attempts or not self._threads
+        retry = not final and not self._stop.is_set()
+        with get_conn() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status=?, error=?, owner=NULL, lease_until=NULL, updated_at=? "
+                "WHERE id=? AND status='running' AND owner=?",
+                ("failed" if final else "queued", error, int(time.time()), job_id, self.owner),
+            ).rowcount
+        if not updated:
+            return  # lease lost: the job is someone else's now
+        if final:
+            cleanup = self._cleanups.get(kind)
+            if cleanup is not None:
+                try:
+                    cleanup(json.loads(payload))
+                except Exception:
+                    # the job is already recorded as failed
+                    with self._lock:
+                        self.cleanup_failures += 1
+                    log.exception("job queue: cleanup for failed %s job %d raised", kind, job_id)
+            with self._lock:
+                self.failed += 1
+            return
+        if not retry:
+            return
+        with self._lock:
+            self.retried += 1
+            timer = threading.Timer(self.backoff * 2 ** (attempts - 1), self._retry, args=(job_id,))
+            timer.daemon = True
+            self._timers.add(timer)
+        timer.start()
+
+    def _retry(self, job_id: int):
+        with self._lock:
+            self._timers = {t for t in self._timers if t.is_alive() and t is not threading.current_thread()}
+        self._enqueue(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": len(self._threads),
+            "queued": self._queue.qsize(),
+            "running": self.running,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "pruned": self.pruned,
+            "reclaimed": self.reclaimed,
+            "errors": self.errors,
+            "cleanup_failures": self.cleanup_failures,
+        }
+
+
+JOB_QUEUE = JobQueue(JOB_WORKERS, JOB_QUEUE_MAX, JOB_MAX_ATTEMPTS, JOB_RETRY_BACKOFF)
@@ -0,0 +1,116 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from app.core.config import CHAT_ARCHIVE_BATCH, CHAT_ARCHIVE_DIR, CHAT_RETENTION_DAYS, CHAT_RETENTION_INTERVAL
+from app.data.database import get_conn
+
+log = logging.getLogger(__name__)
+
+
+class ChatLogArchiver:
+    """
+    Background retention for chat_logs. Every `interval` seconds, rows older
+    than `retention_days` are written, oldest first and `batch` rows at a time,
+    to gzip NDJSON files named by id range, then deleted from the hot table.
+
+    A file is fsynced before its rows are deleted, so a crash in between leaves
+    a row in both places, never in neither; the rerun rewrites the same file.
+    Counters and rollups are insert-triggered and unaffected by the prune.
+    """
+
+    def __init__(self, retention_days: float, archive_dir: str, interval: float, batch: int):
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self.batch = batch
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.archived_rows = 0
+        self.files = 0
+        self.failures = 0
+        self.last_run: Optional[int] = None
+
+    def start(self):
+        if self._thread is not None or self.retention_days <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="chat-log-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                # try again next interval; nothing is deleted unless its archive was written
+                self.failures += 1
+                log.exception("chat log archiver: run failed, will retry in %ss", self.interval)
+            self._stop.wait(self.interval)
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        """Archive and prune everything past the cutoff. Returns the number of rows moved."""
+        cutoff = int((now or time.time()) - self.retention_days * 86400)
+        moved = 0
+        while not self._stop.is_set():
+            n = self._archive_batch(cutoff)
+            moved += n
+            if n < self.batch:
+                break
+        self.runs += 1
+        self.last_run = int(time.time())
+        return moved
+
+    def _archive_batch(self, cutoff: int) -> int:
+        with get_conn() as conn:
+            rows = conn.execute(
+                "SELECT id, session_id, role, content, created_at FROM chat_logs "
+                "WHERE created_at < ? ORDER BY id LIMIT ?",
+                (cutoff, self.batch),
+            ).fetchall()
+        if not rows:
+            return 0
+        first, last = rows[0]["id"], rows[-1]["id"]
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"chat_logs-{first:012d}-{last:012d}.ndjson.gz")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for r in rows:
+                    f.write((json.dumps(dict(r)) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp, path)
+
+        # same predicate as the SELECT: exactly the archived rows (new rows are never past the cutoff)
+        with get_conn() as conn:
+            conn.execute("DELETE FROM chat_logs WHERE id BETWEEN ? AND ? AND created_at < ?", (first, last, cutoff))
+        self.archived_rows += len(rows)
+        self.files += 1
+        return len(rows)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "retention_days": self.retention_days,
+            "runs": self.runs,
+            "archived_rows": self.archived_rows,
+            "files": self.files,
+            "failures": self.failures,
+            "last_run": self.last_run,
+        }
+
+
+CHAT_ARCHIVER = ChatLogArchiver(CHAT_RETENTION_DAYS, CHAT_ARCHIVE_DIR, CHAT_RETENTION_INTERVAL, CHAT_ARCHIVE_BATCH)
@@ -0,0 +1,298 @@
+import logging
+import os
+import re
+import threading
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import (
+    CONTENT_CONTEXT_SNIPPET_CHARS,
+    RETRIEVAL_DIM,
+    RETRIEVAL_INDEX_PATH,
+    RETRIEVAL_MIN_SCORE,
+    RETRIEVAL_TOP_K,
+)
+from app.core.state import CONTENT_GENERATION
+from app.data.database import get_conn
+
+log = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+# snapshot rows re-embedded by load() to check it still matches the database
+SNAPSHOT_CHECK_ROWS = 16
+
+
+def embed_many(texts: Sequence[str], dim: int = RETRIEVAL_DIM) -> np.ndarray:
+    """
+    Hashed, sublinear term-frequency vectors, L2-normalised, one row per text.
+    Signed feature hashing (crc32, stable across restarts); no network, no model.
+    """
+    counts = [0] * len(texts)
+    hashes = []
+    for i, text in enumerate(texts):
+        words = _WORD_RE.findall(text.lower())
+        counts[i] = len(words)
+        hashes.extend(zlib.crc32(w.encode("utf-8")) for w in words)
+    hashes = np.asarray(hashes, dtype=np.int64)
+    rows = np.repeat(np.arange(len(texts)), counts)
+    signs = np.where(hashes & (1 << 31), -1.0, 1.0)
+    flat = np.bincount(rows * dim + hashes % dim, weights=signs, minlength=len(texts) * dim)
+    matrix = flat.reshape(len(texts), dim).astype(np.float32)
+    nz = matrix != 0
+    matrix[nz] = np.sign(matrix[nz]) * (1 + np.log(np.abs(matrix[nz])))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def embed(text: str, dim: int = RETRIEVAL_DIM) -> np.ndarray:
+    return embed_many([text], dim)[0]
+
+
+class VectorIndex:
+    """
+    Dense passage index for chat retrieval. Document rows are stored as
+    normalised hashed-TF vectors; the query side is weighted by the current IDF,
+    so appends never invalidate existing rows.
+
+    Rows live in two parts: a read-only `base` memory-mapped from the .npy
+    snapshot, and an in-RAM `tail` that incremental appends go into. save()
+    folds the tail into a new snapshot. Search is one matmul per part.
+    """
+
+    def __init__(self, dim: int, path: str):
+        self.dim = dim
+        self.path = path
+        self._lock = threading.Lock()
+        self._base = np.zeros((0, dim), dtype=np.float32)
+        self._base_ids = np.zeros(0, dtype=np.int64)
+        self._tail = np.zeros((64, dim), dtype=np.float32)
+        self._tail_ids = np.zeros(64, dtype=np.int64)
+        self._tail_len = 0
+        self._df = np.zeros(dim, dtype=np.int64)
+        self.max_id = 0
+
+    def __len__(self) -> int:
+        return len(self._base_ids) + self._tail_len
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray):
+        n = len(ids)
+        if not n:
+            return
+        with self._lock:
+            need = self._tail_len + n
+            if need > len(self._tail_ids):
+                size = max(need, 2 * len(self._tail_ids))
+                tail, tail_ids = np.zeros((size, self.dim), dtype=np.float32), np.zeros(size, dtype=np.int64)
+                tail[:self._tail_len], tail_ids[:self._tail_len] = self._tail[:self._tail_len], self._tail_ids[:self._tail_len]
+                self._tail, self._tail_ids = tail, tail_ids
+            self._tail[self._tail_len:need] = vectors
+            self._tail_ids[self._tail_len:need] = ids
+            self._tail_len = need
+            self._df += np.count_nonzero(vectors, axis=0)
+            self.max_id = max(self.max_id, int(max(ids)))
+
+    def add_texts(self, rows: Sequence[Tuple[int, str]]):
+        self.add([i for i, _ in rows], embed_many([t for _, t in rows], self.dim))
+
+    def search(self, text: str, k: int) -> List[Tuple[int, float]]:
+        with self._lock:
+            base, base_ids = self._base, self._base_ids
+            tail, tail_ids = self._tail[:self._tail_len], self._tail_ids[:self._tail_len]
+            df = self._df.copy()
+        n = len(base_ids) + len(tail_ids)
+        if not n:
+            return []
+        idf = np.log((1 + n) / (1 + df)).astype(np.float32) + 1
+        query = embed(text, self.dim) * idf
+        norm = float(np.linalg.norm(query))
+        if not norm:
+            return []
+        query /= norm
+        scores = np.concatenate([base @ query, tail @ query])
+        ids = np.concatenate([base_ids, tail_ids])
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def load(self, lookup: Optional[Callable[[List[int]], Dict[int, str]]] = None) -> bool:
+        """
+        mmap the snapshot if it exists and matches `dim`. Returns whether it did.
+
+        With `lookup` (ids -> current texts), a spread of snapshot rows, always
+        including the last, is re-embedded and must match what was stored; a
+        snapshot left over from a deleted or replaced database is ignored.
+        """
+        if not os.path.isfile(self.path):
+            return False
+        base = np.load(self.path, mmap_mode="r")
+        ids = np.load(self.path + ".ids.npy")
+        if base.ndim != 2 or base.shape[1] != self.dim or len(ids) != base.shape[0]:
+            return False
+        if lookup is not None and len(ids):
+            pick = np.unique(np.linspace(0, len(ids) - 1, min(len(ids), SNAPSHOT_CHECK_ROWS)).astype(np.int64))
+            texts = lookup([int(i) for i in ids[pick]])
+            if any(int(i) not in texts for i in ids[pick]):
+                return False
+            expected = embed_many([texts[int(i)] for i in ids[pick]], self.dim)
+            if not np.allclose(base[pick], expected, atol=1e-5):
+                return False
+        with self._lock:
+            self._base, self._base_ids = base, ids
+            self._df = np.count_nonzero(base, axis=0).astype(np.int64) + np.count_nonzero(
+                self._tail[:self._tail_len], axis=0
+            )
+            self.max_id = max(self.max_id, int(ids.max()) if len(ids) else 0)
+        return True
+
+    def save(self):
+        with self._lock:
+            saved = self._tail_len
+            matrix = np.concatenate([self._base, self._tail[:saved]])
+            ids = np.concatenate([self._base_ids, self._tail_ids[:saved]])
+        # write-then-rename so a concurrent reader never sees a half-written file;
+        # temp names are per process, since every worker saves at shutdown
+        tmp, ids_tmp = f"{self.path}.{os.getpid()}.tmp.npy", f"{self.path}.ids.{os.getpid()}.tmp.npy"
+        np.save(tmp, matrix)
+        np.save(ids_tmp, ids)
+        os.replace(ids_tmp, self.path + ".ids.npy")
+        os.replace(tmp, self.path)
+        with self._lock:
+            self._base, self._base_ids = np.load(self.path, mmap_mode="r"), ids
+            # keep rows appended while the snapshot was being written; fresh arrays,
+            # since in-flight searches may still hold views of the old tail
+            rest = self._tail_len - saved
+            tail, tail_ids = np.zeros_like(self._tail), np.zeros_like(self._tail_ids)
+            tail[:rest], tail_ids[:rest] = self._tail[saved:self._tail_len], self._tail_ids[saved:self._tail_len]
+            self._tail, self._tail_ids, self._tail_len = tail, tail_ids, rest
+
+    def stats(self):
+        return {"rows": len(self), "dim": self.dim, "mmapped_rows": len(self._base_ids), "ram_rows": self._tail_len}
+
+
+RETRIEVAL_INDEX = VectorIndex(RETRIEVAL_DIM, RETRIEVAL_INDEX_PATH)
+
+
+def index_content(after_id: int, batch: int = 1000):
+    """Embed content rows with id > after_id, `batch` rows at a time."""
+    with get_conn() as conn:
+        cur = conn.execute("SELECT id, title, body FROM content WHERE id > ? ORDER BY id", (after_id,))
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            RETRIEVAL_INDEX.add_texts([(r["id"], f"{r['title']}\n{r['body']}") for r in rows])
+
+
+_sync_lock = threading.Lock()
+_synced_generation = -1
+
+
+def sync_retrieval_index():
+    """
+    Embed every content row past the index's high-water mark. Content ids are
+    assigned under SQLite's write lock, i.e. in commit order, so rows written by
+    other workers are picked up too and nothing below the mark can still appear.
+    """
+    global _synced_generation
+    with _sync_lock:
+        gen = CONTENT_GENERATION.value
+        index_content(RETRIEVAL_INDEX.max_id)
+        _synced_generation = gen
+
+
+class RetrievalSyncer:
+    """
+    Background catch-up for the index after content writes. request() only sets
+    an Event, so a burst of writes shares one sync and nothing is persisted: a
+    sync is idempotent and get_relevant_context also catches up lazily, so a
+    request lost to a restart costs nothing. Without the thread, request() is a no-op.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+        self.runs = 0
+        self.failures = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="retrieval-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def request(self):
+        self.requests += 1
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            if self._stop.is_set():
+                return
+            self._wake.clear()  # writes landing from here on need another run
+            try:
+                sync_retrieval_index()
+            except Exception:
+                # the next write or chat retries
+                self.failures += 1
+                log.exception("retrieval sync failed")
+            self.runs += 1
+
+    def stats(self):
+        return {"requests": self.requests, "runs": self.runs, "failures": self.failures}
+
+
+RETRIEVAL_SYNCER = RetrievalSyncer()
+
+
+def _content_texts(ids: List[int]) -> Dict[int, str]:
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"SELECT id, title, body FROM content WHERE id IN ({','.join('?' * len(ids))})", ids
+        ).fetchall()
+    return {r["id"]: f"{r['title']}\n{r['body']}" for r in rows}
+
+
+def init_retrieval_index():
+    """
+    Map the snapshot if it still matches the content table, then embed whatever
+    content was written after it. A stale snapshot is rebuilt from scratch and
+    overwritten by the next save().
+    """
+    if not RETRIEVAL_INDEX.load(_content_texts) and os.path.isfile(RETRIEVAL_INDEX.path):
+        log.warning("retrieval snapshot %s does not match the database; rebuilding", RETRIEVAL_INDEX.path)
+    sync_retrieval_index()
+
+
+def get_relevant_context(
+    message: str, k: int = RETRIEVAL_TOP_K, snippet_chars: int = CONTENT_CONTEXT_SNIPPET_CHARS
+) -> Optional[str]:
+    """Top-k passages for `message` as a prompt block, or None when nothing scores above the floor."""
+    if CONTENT_GENERATION.value != _synced_generation:
+        sync_retrieval_index()  # content written since, possibly by another worker
+    hits = [(i, s) for i, s in RETRIEVAL_INDEX.search(message, k) if s >= RETRIEVAL_MIN_SCORE]
+    if not hits:
+        return None
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"SELECT id, title, body FROM content WHERE id IN ({','.join('?' * len(hits))})",
+            [i for i, _ in hits],
+        ).fetchall()
+    by_id = {r["id"]: r for r in rows}
+    return "\n".join(
+        f"- {by_id[i]['title']}: {by_id[i]['body'][:snippet_chars]}" for i, _ in hits if i in by_id
+    )
@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import re
+import zlib
+from typing import Awaitable, Callable, Dict, List
+
+from app.core.config import (
+    SUMMARY_CACHE_MAX_ENTRIES,
+    SUMMARY_CACHE_TTL,
+    SUMMARY_CHUNK_TOKENS,
+    SUMMARY_MAX_FANOUT,
+    SUMMARY_MAX_LEVELS,
+)
+from app.core.state import make_cache, state_io
+from app.services.chat_service import estimate_tokens
+
+LLMCall = Callable[[List[Dict[str, str]]], Awaitable[str]]
+
+# (model, prompt kind, sha256 of the text) -> partial summary
+SUMMARY_CACHE = make_cache("summary_chunks", SUMMARY_CACHE_MAX_ENTRIES, SUMMARY_CACHE_TTL, 64 * 1024 * 1024)
+
+MAP_PROMPT = "Summarize this section of a longer document in a few sentences, keeping key facts:\n\n"
+REDUCE_PROMPT = "Combine these partial summaries of one document into a single shorter summary:\n\n"
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _pieces(text: str, max_tokens: int) -> List[str]:
+    """Paragraphs, with any paragraph over budget broken into sentences (then hard slices)."""
+    out = []
+    for para in re.split(r"\n\s*\n", text):
+        para = para.strip()
+        if not para:
+            continue
+        if estimate_tokens(para) <= max_tokens:
+            out.append(para)
+            continue
+        for sentence in _SENTENCE_RE.split(para):
+            step = max_tokens * 4
+            out.extend(sentence[i:i + step] for i in range(0, len(sentence), step))
+    return out
+
+
+def split_chunks(text: str, max_tokens: int = SUMMARY_CHUNK_TOKENS) -> List[str]:
+    """
+    Pack paragraphs into chunks of at most `max_tokens`. Once a chunk is at
+    least half full it also ends after any paragraph whose crc32 is divisible
+    by 8 (content-defined boundary), so an edit in one place tends to change
+    only the chunk it lands in and the cached summaries of the others still
+    hit, while no chunk is cut short enough to waste a map call.
+    """
+    min_fill = max_tokens // 2
+    chunks, current, used = [], [], 0
+    for piece in _pieces(text, max_tokens):
+        cost = estimate_tokens(piece)
+        if current and used + cost > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, used = [], 0
+        current.append(piece)
+        used += cost
+        if used >= min_fill and zlib.crc32(piece.encode("utf-8")) % 8 == 0:
+            chunks.append("\n\n".join(current))
+            current, used = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+async def _cached_call(llm: LLMCall, model: str, kind: str, prompt: str, text: str, bypass: bool) -> str:
+    key = (model, kind, hashlib.sha256(text.encode("utf-8")).hexdigest())
+    if not bypass:
+        cached = await state_io(SUMMARY_CACHE.get, key)
+        if cached is not None:
+            return cached
+    result = await llm([{"role": "user", "content": prompt + text}])
+    await state_io(SUMMARY_CACHE.set, key, result)
+    return result
+
+
+async def _summarize_all(
+    llm: LLMCall, model: str, kind: str, prompt: str, texts: List[str], bypass: bool
+) -> List[str]:
+    slots = asyncio.Semaphore(SUMMARY_MAX_FANOUT)
+
+    async def one(text: str) -> str:
+        async with slots:
+            return await _cached_call(llm, model, kind, prompt, text, bypass)
+
+    return await asyncio.gather(*(one(t) for t in texts))
+
+
+async def map_reduce(text: str, model: str, llm: LLMCall, bypass_cache: bool = False) -> Dict[str, object]:
+    """
+    Reduce `text` to something that fits one prompt. Returns the reduced text
+    (the original when it already fits) and how many chunks the map step used.
+    The caller makes the final 2-3 sentence call with its own system prompt.
+    `bypass_cache` skips cached partial summaries (fresh ones are still stored).
+    """
+    if estimate_tokens(text) <= SUMMARY_CHUNK_TOKENS:
+        return {"text": text, "chunks": 1}
+    chunks = split_chunks(text)
+
+    partials = await _summarize_all(llm, model, "map", MAP_PROMPT, chunks, bypass_cache)
+    for _ in range(SUMMARY_MAX_LEVELS):
+        joined = "\n\n".join(partials)
+        if estimate_tokens(joined) <= SUMMARY_CHUNK_TOKENS:
+            return {"text": joined, "chunks": len(chunks)}
+        groups = split_chunks(joined)
+        if len(groups) >= len(partials):
+            break  # not shrinking; stop paying for calls
+        partials = await _summarize_all(llm, model, "reduce", REDUCE_PROMPT, groups, bypass_cache)
+
+    # still over budget after SUMMARY_MAX_LEVELS rounds: trim each partial evenly
+    per_partial = max(1, SUMMARY_CHUNK_TOKENS * 4 // len(partials))
+    return {"text": "\n\n".join(p[:per_partial] for p in partials), "chunks": len(chunks)}
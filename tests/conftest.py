@@ -0,0 +1,46 @@
+"""
+The modules import each other as `app.*`: this tree is the app/ package of the
+README layout. Alias the repo root (and app/, for `app.main`) as that package so
+the suite runs from a plain checkout, and point every on-disk path at a temp dir
+before config is read.
+"""
+
+import os
+import sys
+import tempfile
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TMP = tempfile.mkdtemp(prefix="app-tests-")
+
+os.environ.update(
+    DB_PATH=os.path.join(_TMP, "app.db"),
+    JOB_SPOOL_DIR=os.path.join(_TMP, "spool"),
+    CHAT_ARCHIVE_DIR=os.path.join(_TMP, "archive"),
+    PROFILE_DIR=os.path.join(_TMP, "profiles"),
+    GROQ_API_KEY="",  # stub transport: no network
+    GROQ_STUB_TOKEN_DELAY="0",
+    RATE_LIMIT_BURST="100000",
+)
+
+_pkg = types.ModuleType("app")
+_pkg.__path__ = [ROOT, os.path.join(ROOT, "app")]
+sys.modules["app"] = _pkg
+
+# password-hash workers come from a forkserver and import app.* by name without
+# the alias above; give them a real `app` on the (inherited) sys.path
+os.makedirs(os.path.join(_TMP, "path"))
+os.symlink(ROOT, os.path.join(_TMP, "path", "app"))
+sys.path.insert(0, os.path.join(_TMP, "path"))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def db():
+    from app.data.database import init_db, pool
+
+    init_db()
+    yield
+    pool.close_all()
+
@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from starlette.requests import ClientDisconnect
+
+from app.main import app
+from app.clients.groq_client import groq_client
+from app.core.admission import LLM_GATE, AdmissionGate
+from app.core.security import make_token
+
+AUTH = {"authorization": f"Bearer {make_token('gate-user')}"}
+
+
+def test_gate_sheds_with_retry_after_when_queue_is_full():
+    async def run():
+        gate = AdmissionGate(max_concurrent=1, max_queue=0, queue_timeout=1)
+        slot = await gate.acquire()
+        with pytest.raises(HTTPException) as exc:
+            await gate.acquire()
+        assert exc.value.status_code == 503
+        assert int(exc.value.headers["Retry-After"]) >= 1
+        slot.release()
+        slot.release()  # idempotent
+        assert gate.in_flight == 0
+        (await gate.acquire()).release()
+
+    asyncio.run(run())
+
+
+def test_stream_releases_slot_after_completion():
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.post("/chat/stream", json={"message": "hello there"}, headers=AUTH)
+        await groq_client.aclose()
+        return resp
+
+    resp = asyncio.run(run())
+    assert resp.status_code == 200
+    assert "event: done" in resp.text
+    assert LLM_GATE.in_flight == 0
+
+
+def test_stream_releases_slot_when_client_is_gone_before_headers():
+    body = json.dumps({"message": "hi"}).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/chat/stream",
+        "raw_path": b"/chat/stream",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(k.encode(), v.encode()) for k, v in AUTH.items()] + [(b"content-type", b"application/json")],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+
+    async def one():
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.sleep(10)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                raise OSError("client disconnected")
+
+        with pytest.raises((OSError, ClientDisconnect)):
+            await app(scope, receive, send)
+
+    async def run():
+        for _ in range(5):
+            await one()
+        await groq_client.aclose()
+
+    asyncio.run(run())
+    assert LLM_GATE.in_flight == 0
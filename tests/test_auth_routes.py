@@ -0,0 +1,48 @@
+import asyncio
+
+import httpx
+
+from app.api import auth_routes
+from app.core.security import DUMMY_PASSWORD_HASH, md5_hash, shutdown_hash_pool, verify_password
+from app.main import app
+
+
+def _post(path: str, body: dict) -> httpx.Response:
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            try:
+                return await client.post(path, json=body)
+            finally:
+                shutdown_hash_pool()  # the pool's semaphore belongs to this loop
+
+    return asyncio.run(run())
+
+
+def test_login_upgrades_a_legacy_md5_hash():
+    auth_routes._insert_user("legacy-user", md5_hash("old secret"))
+
+    assert _post("/login", {"username": "legacy-user", "password": "old secret"}).status_code == 200
+    stored = auth_routes._get_password_hash("legacy-user")
+    assert stored.startswith("scrypt$")
+    assert verify_password("old secret", stored)
+
+    assert _post("/login", {"username": "legacy-user", "password": "old secret"}).status_code == 200
+    assert _post("/login", {"username": "legacy-user", "password": "wrong"}).status_code == 401
+    assert auth_routes._get_password_hash("legacy-user") == stored
+
+
+def test_unknown_user_pays_for_a_dummy_verify(monkeypatch):
+    verified = []
+
+    async def recording_verify(password, stored):
+        verified.append(stored)
+        return verify_password(password, stored)
+
+    monkeypatch.setattr(auth_routes, "verify_password_async", recording_verify)
+    resp = _post("/login", {"username": "nobody-here", "password": "guess"})
+
+    assert resp.status_code == 401
+    assert resp.json()["detail"] == "Invalid credentials"
+    assert verified == [DUMMY_PASSWORD_HASH]
+    assert not verify_password("", DUMMY_PASSWORD_HASH)
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from app.data.database import get_conn
+from app.services.chat_service import ChatLogWriter
+
+
+def _rows(session_id: str) -> int:
+    with get_conn() as conn:
+        return conn.execute("SELECT COUNT(*) FROM chat_logs WHERE session_id=?", (session_id,)).fetchone()[0]
+
+
+def test_failed_batch_is_retried_not_dropped():
+    writer = ChatLogWriter(batch_size=10, flush_interval=0.01, max_pending=100)
+    real_write, attempts = writer._write, []
+
+    def flaky_write(batch, metrics):
+        attempts.append(len(batch))
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+        real_write(batch, metrics)
+
+    writer._write = flaky_write
+    writer.start()
+    try:
+        for i in range(5):
+            writer.enqueue("writer-retry", "user", f"message {i}")
+        deadline = time.monotonic() + 5
+        while _rows("writer-retry") < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        writer.stop()
+
+    assert _rows("writer-retry") == 5
+    stats = writer.stats()
+    assert stats["failed_batches"] == 1
+    assert stats["dropped"] == 0
+    assert stats["pending"] == 0
+
+
+def test_backlog_past_twice_max_pending_drops_oldest_and_counts_them():
+    writer = ChatLogWriter(batch_size=10, flush_interval=0.01, max_pending=2)
+
+    def broken_write(batch, metrics):
+        raise RuntimeError("disk full")
+
+    writer._write = broken_write
+    for i in range(5):
+        with pytest.raises(RuntimeError):
+            writer.enqueue("writer-overflow", "user", f"message {i}")  # no thread: writes through
+
+    stats = writer.stats()
+    assert stats["failed_batches"] == 5
+    assert stats["pending"] == 4
+    assert stats["dropped"] == 1
+    assert [r[2] for r in writer._pending] == ["message 1", "message 2", "message 3", "message 4"]
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import httpx
+
+from app.api import content_routes
+from app.core.security import make_token
+from app.main import app
+
+AUTH = {"authorization": f"Bearer {make_token('bulk-user')}"}
+
+
+def _post_bulk(lines):
+    async def body():
+        for line in lines:
+            yield line.encode() + b"\n"
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/content/bulk", content=body(), headers=AUTH)
+
+    return asyncio.run(run())
+
+
+def test_bulk_failed_batch_is_reported_and_the_import_goes_on(monkeypatch):
+    real_insert, calls = content_routes.bulk_create_content, []
+
+    def flaky_insert(rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("database is locked")
+        return real_insert(rows)
+
+    monkeypatch.setattr(content_routes, "BULK_BATCH_SIZE", 2)
+    monkeypatch.setattr(content_routes, "bulk_create_content", flaky_insert)
+    lines = [json.dumps({"title": f"bulk {i}", "body": f"row {i}"}) for i in range(1, 7)]
+    lines.insert(3, "{not json")  # line 4
+
+    resp = _post_bulk(lines)
+
+    assert resp.status_code == 200
+    report = resp.json()
+    assert calls == [2, 2, 2]
+    assert report["inserted"] == 4
+    assert report["failed"] == 3
+    assert report["errors"][0]["line"] == 4
+    assert report["errors"][1] == {"line": 3, "last_line": 5, "error": "batch insert failed: database is locked"}
+
+
+def test_search_cache_is_invalidated_by_a_content_write():
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def search():
+                return (await client.post("/content/search", json={"query": "quokka"})).json()
+
+            first, again = await search(), await search()
+            await client.post("/content/create", json={"title": "Quokka", "body": "a small marsupial"}, headers=AUTH)
+            fresh = await search()
+        return first, again, fresh
+
+    first, again, fresh = asyncio.run(run())
+    assert first == {"cached": False, "results": []}
+    assert again == {"cached": True, "results": []}
+    assert fresh["cached"] is False
+    assert [r["title"] for r in fresh["results"]] == ["Quokka"]
@@ -0,0 +1,53 @@
+import pytest
+
+from app.data.database import get_conn
+from app.services.content_service import create_content, list_content, search_content, to_fts_query
+
+
+@pytest.mark.parametrize("q, expected", [
+    ("hello world", '"hello" "world"'),
+    ('"exact phrase" pre*', '"exact phrase" "pre"*'),
+    ("a OR b", '"a" "OR" "b"'),  # operators are plain terms
+    ("NEAR(x y)", '"NEAR(x" "y)"'),
+    ("col:val -x", '"col:val" "-x"'),
+    ('say "hi', '"say" "hi"'),  # unbalanced quote
+    ("***", ""),
+])
+def test_to_fts_query_quotes_every_term(q, expected):
+    assert to_fts_query(q) == expected
+
+
+def test_search_ranks_matches_and_survives_fts_syntax():
+    create_content("Zebra migration", "zebras cross the river every year")
+    create_content("Unrelated", "nothing to see, apart from one zebra")
+
+    hits = search_content("zebra*")
+    assert [h["title"] for h in hits][:2] == ["Zebra migration", "Unrelated"]
+    assert [h["title"] for h in search_content('"cross the river"')] == ["Zebra migration"]
+    for q in ("NEAR(zebra", 'zebra"', "title:zebra", "-zebra", "***"):
+        search_content(q)  # no sqlite3.OperationalError
+
+
+def test_keyset_pages_end_exactly_at_the_last_row():
+    for i in range(5):
+        create_content(f"page item {i}", "body")
+    with get_conn() as conn:
+        all_ids = [r[0] for r in conn.execute("SELECT id FROM content ORDER BY id DESC")]
+    total = len(all_ids)
+
+    # a page that ends on the last row has no next cursor...
+    items, cursor = list_content(total)
+    assert [i["id"] for i in items] == all_ids and cursor is None
+    # ...one row short does, and the next page holds just that row
+    items, cursor = list_content(total - 1)
+    assert cursor == items[-1]["id"] == all_ids[-2]
+    items, cursor = list_content(total - 1, cursor)
+    assert [i["id"] for i in items] == all_ids[-1:] and cursor is None
+
+    seen, cursor = [], None
+    while True:
+        items, cursor = list_content(2, cursor)
+        seen += [i["id"] for i in items]
+        if cursor is None:
+            break
+    assert seen == all_ids
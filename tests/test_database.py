@@ -0,0 +1,32 @@
+from app.data.database import MIGRATIONS, ConnectionPool, migrate
+
+
+def test_migrate_applies_each_version_once(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "fresh.db"))
+    try:
+        with pool.connection() as conn:
+            assert migrate(conn) == [v for v, _, _ in MIGRATIONS]
+        with pool.connection() as conn:
+            assert migrate(conn) == []
+            rows = conn.execute("SELECT version, name FROM schema_migrations ORDER BY version").fetchall()
+        assert [tuple(r) for r in rows] == [(v, name) for v, name, _ in MIGRATIONS]
+    finally:
+        pool.close_all()
+
+
+def test_migrate_stamps_a_database_from_before_the_runner(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "legacy.db"))
+    try:
+        with pool.connection() as conn:
+            # the monolith's schema, with a user in it
+            conn.execute(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, "
+                "password_hash TEXT NOT NULL, created_at INTEGER NOT NULL)"
+            )
+            conn.execute("INSERT INTO users (username, password_hash, created_at) VALUES ('old', 'x', 0)")
+        with pool.connection() as conn:
+            assert migrate(conn) == [v for v, _, _ in MIGRATIONS]
+            assert conn.execute("SELECT username FROM users").fetchone()[0] == "old"
+            conn.execute("SELECT job_id FROM upload_ingests")  # later migrations ran too
+    finally:
+        pool.close_all()
@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.clients.groq_client import GroqClient, GroqError, groq_client
+from app.core.security import make_token
+from app.main import app
+
+AUTH = {"authorization": f"Bearer {make_token('groq-user')}"}
+
+
+def _reply(text: str) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"role": "assistant", "content": text}}]})
+
+
+def test_retries_retryable_status_then_succeeds():
+    statuses = [503, 429]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if statuses:
+            return httpx.Response(statuses.pop(0), headers={"retry-after": "0"})
+        return _reply("ok")
+
+    client = GroqClient(api_key="k", transport=httpx.MockTransport(handler), backoff_max=0)
+
+    async def run():
+        try:
+            return await client.chat([{"role": "user", "content": "hi"}], "m")
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == "ok"
+    assert client.retries == 2
+    assert client.in_flight == 0
+
+
+def test_non_retryable_status_raises_without_retrying():
+    client = GroqClient(api_key="k", transport=httpx.MockTransport(lambda request: httpx.Response(401)))
+
+    async def run():
+        try:
+            await client.chat([{"role": "user", "content": "hi"}], "m")
+        finally:
+            await client.aclose()
+
+    with pytest.raises(GroqError) as exc:
+        asyncio.run(run())
+    assert exc.value.status_code == 401
+    assert client.retries == 0
+
+
+@pytest.mark.parametrize("response", [
+    httpx.Response(200, text="<html>bad gateway</html>"),
+    httpx.Response(200, json={"error": "no choices"}),
+])
+def test_malformed_reply_raises_groq_error(response):
+    client = GroqClient(api_key="k", transport=httpx.MockTransport(lambda request: response))
+
+    with pytest.raises(GroqError):
+        asyncio.run(client.chat([{"role": "user", "content": "hi"}], "m"))
+    assert client.in_flight == 0
+
+
+def test_client_is_rebuilt_for_a_new_event_loop():
+    async def slow(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.01)
+        return _reply("ok")
+
+    client = GroqClient(api_key="k", transport=httpx.MockTransport(slow), max_in_flight=1)
+
+    async def run():
+        # contended, so the semaphore really waits on this loop
+        calls = [client.chat([{"role": "user", "content": "hi"}], "m") for _ in range(3)]
+        return await asyncio.gather(*calls)
+
+    for _ in range(2):
+        assert asyncio.run(run()) == ["ok"] * 3
+
+
+def test_malformed_upstream_reply_is_a_502_and_a_stream_error(monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if b'"stream": true' in request.content or b'"stream":true' in request.content:
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=b"data: {not json}\n\n")
+        return httpx.Response(200, json={"unexpected": True})
+
+    monkeypatch.setattr(groq_client, "transport", httpx.MockTransport(handler))
+    monkeypatch.setattr(groq_client, "_http", None)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            plain = await client.post("/chat", json={"message": "malformed plain"}, headers=AUTH)
+            stream = await client.post("/chat/stream", json={"message": "malformed stream"}, headers=AUTH)
+        return plain, stream
+
+    plain, stream = asyncio.run(run())
+    assert plain.status_code == 502
+    assert stream.status_code == 200
+    assert "event: error" in stream.text
@@ -0,0 +1,189 @@
+import io
+import os
+import threading
+import time
+
+from app.data.database import get_conn
+from app.services.content_service import _ingest_upload_job, spool_upload
+from app.services.job_service import JobQueue
+
+
+def _queue(**kwargs) -> JobQueue:
+    opts = dict(workers=1, max_queue=10, max_attempts=3, backoff=0.01, retention_hours=0)
+    opts.update(kwargs)
+    return JobQueue(**opts)
+
+
+def _wait_finished(jobs: JobQueue, job_id: int, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    return jobs.get(job_id)
+
+
+def test_failed_attempt_is_retried_until_it_succeeds():
+    jobs, calls = _queue(), []
+
+    @jobs.handler("test_flaky")
+    def flaky(job_id, payload):
+        calls.append(job_id)
+        if len(calls) < 2:
+            raise RuntimeError("transient")
+        return {"value": payload["value"]}
+
+    jobs.start()
+    try:
+        job = _wait_finished(jobs, jobs.submit("test_flaky", {"value": 7}))
+    finally:
+        jobs.stop()
+
+    assert job["status"] == "done"
+    assert job["attempts"] == 2
+    assert job["result"] == {"value": 7}
+    assert jobs.stats()["retried"] == 1
+
+
+def test_final_failure_runs_cleanup_once():
+    jobs, cleaned = _queue(), []
+
+    @jobs.handler("test_broken", cleanup=cleaned.append)
+    def broken(job_id, payload):
+        raise ValueError("bad input")
+
+    jobs.start()
+    try:
+        job = _wait_finished(jobs, jobs.submit("test_broken", {"path": "x"}))
+    finally:
+        jobs.stop()
+
+    assert job["status"] == "failed"
+    assert job["attempts"] == 3
+    assert "ValueError: bad input" in job["error"]
+    assert cleaned == [{"path": "x"}]
+
+
+def test_failing_cleanup_is_logged_and_counted(caplog):
+    jobs = _queue(max_attempts=1)
+
+    def bad_cleanup(payload):
+        raise OSError("permission denied")
+
+    @jobs.handler("test_bad_cleanup", cleanup=bad_cleanup)
+    def broken(job_id, payload):
+        raise ValueError("bad input")
+
+    jobs.start()
+    try:
+        job = _wait_finished(jobs, jobs.submit("test_bad_cleanup", {}))
+        deadline = time.monotonic() + 5
+        while not jobs.stats()["cleanup_failures"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        jobs.stop()
+
+    assert job["status"] == "failed"
+    assert jobs.stats()["cleanup_failures"] == 1
+    assert "cleanup for failed test_bad_cleanup job" in caplog.text
+
+
+def test_live_lease_is_not_reclaimed_by_another_queue():
+    release, calls = threading.Event(), []
+    a, b = _queue(lease_seconds=0.3), _queue(lease_seconds=0.3)
+    for jobs in (a, b):
+        @jobs.handler("test_slow")
+        def slow(job_id, payload):
+            calls.append(job_id)
+            release.wait(5)
+            return {}
+
+    a.start()
+    try:
+        job_id = a.submit("test_slow", {})
+        while a.get(job_id)["status"] != "running":
+            time.sleep(0.01)
+        b.start()  # a second worker process starting up
+        time.sleep(1.0)  # several lease periods: only a's heartbeat keeps it
+        release.set()
+        job = _wait_finished(a, job_id)
+    finally:
+        release.set()
+        a.stop()
+        b.stop()
+
+    assert job["status"] == "done"
+    assert job["attempts"] == 1
+    assert calls == [job_id]
+    assert b.stats()["reclaimed"] == 0
+
+
+def test_expired_lease_is_reclaimed_and_run():
+    jobs, calls = _queue(), []
+
+    @jobs.handler("test_orphan")
+    def orphan(job_id, payload):
+        calls.append(job_id)
+        return {}
+
+    with get_conn() as conn:
+        job_id = conn.execute(
+            "INSERT INTO jobs (kind, payload, status, attempts, owner, lease_until, created_at, updated_at) "
+            "VALUES ('test_orphan', '{}', 'running', 1, 'dead-host:1:x', ?, 0, 0)",
+            (time.time() - 1,),
+        ).lastrowid
+
+    jobs.start()
+    try:
+        job = _wait_finished(jobs, job_id)
+    finally:
+        jobs.stop()
+
+    assert job["status"] == "done"
+    assert job["attempts"] == 2
+    assert calls == [job_id]
+    assert jobs.stats()["reclaimed"] == 1
+
+
+def test_prune_deletes_only_old_finished_jobs():
+    jobs = _queue(retention_hours=1)
+    now = int(time.time())
+    with get_conn() as conn:
+        old_done = conn.execute(
+            "INSERT INTO jobs (kind, payload, status, created_at, updated_at) VALUES ('x', '{}', 'done', 0, ?)",
+            (now - 7200,),
+        ).lastrowid
+        old_queued = conn.execute(
+            "INSERT INTO jobs (kind, payload, status, created_at, updated_at) VALUES ('x', '{}', 'queued', 0, ?)",
+            (now - 7200,),
+        ).lastrowid
+        recent_failed = conn.execute(
+            "INSERT INTO jobs (kind, payload, status, created_at, updated_at) VALUES ('x', '{}', 'failed', 0, ?)",
+            (now,),
+        ).lastrowid
+
+    assert jobs.prune() >= 1
+    assert jobs.get(old_done) is None
+    assert jobs.get(old_queued) is not None
+    assert jobs.get(recent_failed) is not None
+    with get_conn() as conn:
+        conn.execute("DELETE FROM jobs WHERE id IN (?, ?)", (old_queued, recent_failed))
+
+
+def test_ingest_upload_rerun_does_not_duplicate_passages():
+    def count() -> int:
+        with get_conn() as conn:
+            return conn.execute("SELECT COUNT(*) FROM content WHERE title LIKE 'rerun.txt%'").fetchone()[0]
+
+    payload = {"path": spool_upload(io.BytesIO(b"rerun words here. " * 400)), "title": "rerun.txt"}
+    first = _ingest_upload_job(10_000_001, payload)
+    assert first["passages"] == count() > 0
+    assert not os.path.exists(payload["path"])
+
+    # redelivery after a crash between the ingest commit and the job update
+    payload["path"] = spool_upload(io.BytesIO(b"rerun words here. " * 400))
+    again = _ingest_upload_job(10_000_001, payload)
+    assert again["passages"] == first["passages"]
+    assert count() == first["passages"]
+    assert not os.path.exists(payload["path"])
@@ -0,0 +1,56 @@
+import gzip
+import json
+import os
+import time
+
+from app.data.database import get_conn
+from app.services.retention_service import ChatLogArchiver
+
+
+def _insert(session_id: str, created_at: int, n: int):
+    with get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO chat_logs (session_id, role, content, created_at) VALUES (?, 'user', ?, ?)",
+            [(session_id, f"message {i}", created_at) for i in range(n)],
+        )
+
+
+def _rows(session_id: str) -> int:
+    with get_conn() as conn:
+        return conn.execute("SELECT COUNT(*) FROM chat_logs WHERE session_id=?", (session_id,)).fetchone()[0]
+
+
+def test_run_once_archives_old_rows_then_deletes_them(tmp_path):
+    now = time.time()
+    _insert("archive-old", int(now - 3 * 86400), 5)
+    _insert("archive-new", int(now), 2)
+    archiver = ChatLogArchiver(retention_days=1, archive_dir=str(tmp_path), interval=3600, batch=2)
+
+    assert archiver.run_once(now) >= 5
+
+    assert _rows("archive-old") == 0
+    assert _rows("archive-new") == 2
+    archived = []
+    for name in sorted(os.listdir(tmp_path)):
+        assert name.endswith(".ndjson.gz")
+        with gzip.open(tmp_path / name, "rt") as f:
+            archived += [json.loads(line) for line in f]
+    assert [r["content"] for r in archived if r["session_id"] == "archive-old"] == [f"message {i}" for i in range(5)]
+    assert archiver.stats()["files"] == len(os.listdir(tmp_path)) >= 3  # batch of 2
+
+
+def test_failed_run_is_counted_and_retried(tmp_path):
+    archiver = ChatLogArchiver(retention_days=1, archive_dir=str(tmp_path), interval=0.01, batch=10)
+
+    def broken(now=None):
+        raise OSError("disk full")
+
+    archiver.run_once = broken
+    archiver.start()
+    try:
+        deadline = time.monotonic() + 5
+        while archiver.stats()["failures"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        archiver.stop()
+    assert archiver.stats()["failures"] >= 2
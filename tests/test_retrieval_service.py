@@ -0,0 +1,32 @@
+from app.services.retrieval_service import VectorIndex
+
+TEXTS = {i: f"passage {i}\nabout topic {i % 7} and more words" for i in range(1, 101)}
+
+
+def _snapshot(path: str) -> VectorIndex:
+    index = VectorIndex(64, path)
+    index.add_texts(sorted(TEXTS.items()))
+    index.save()
+    return index
+
+
+def test_snapshot_that_matches_the_content_is_loaded(tmp_path):
+    _snapshot(str(tmp_path / "index.npy"))
+    index = VectorIndex(64, str(tmp_path / "index.npy"))
+    assert index.load(lambda ids: {i: TEXTS[i] for i in ids})
+    assert len(index) == 100
+    assert index.max_id == 100
+
+
+def test_snapshot_from_another_database_is_ignored(tmp_path):
+    _snapshot(str(tmp_path / "index.npy"))
+
+    # the database was deleted: none of the snapshot's rows exist any more
+    empty = VectorIndex(64, str(tmp_path / "index.npy"))
+    assert not empty.load(lambda ids: {})
+    assert len(empty) == 0 and empty.max_id == 0
+
+    # ...or recreated, with different content under the same ids
+    other = VectorIndex(64, str(tmp_path / "index.npy"))
+    assert not other.load(lambda ids: {i: f"something else {i}" for i in ids})
+    assert len(other) == 0 and other.max_id == 0
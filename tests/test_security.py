@@ -0,0 +1,56 @@
+import base64
+import json
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+from app.core.config import TOKEN_TTL
+from app.core.security import TOKEN_CACHE, make_token, sign, verify_token
+
+
+def _token(payload: dict) -> str:
+    raw = json.dumps(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=") + "." + sign(raw)
+
+
+def test_verified_token_is_served_from_the_cache(monkeypatch):
+    token = make_token("cache-user")
+    assert verify_token(token) == "cache-user"
+
+    def no_sign(raw):
+        raise AssertionError("cache hit must not recompute the signature")
+
+    monkeypatch.setattr(security, "sign", no_sign)
+    hits = TOKEN_CACHE.hits
+    assert verify_token(token) == "cache-user"
+    assert TOKEN_CACHE.hits == hits + 1
+
+
+def test_expired_token_is_rejected():
+    token = _token({"sub": "old-user", "iat": int(time.time()) - TOKEN_TTL - 1})
+    with pytest.raises(HTTPException) as exc:
+        verify_token(token)
+    assert exc.value.detail == "Token expired"
+
+
+def test_cached_token_still_expires(monkeypatch):
+    token = make_token("expiring-user")
+    assert verify_token(token) == "expiring-user"
+
+    later = time.time() + TOKEN_TTL + 1
+    monkeypatch.setattr(security.time, "time", lambda: later)
+    with pytest.raises(HTTPException) as exc:
+        verify_token(token)
+    assert exc.value.detail == "Token expired"
+
+
+def test_tampered_payload_is_rejected_even_with_a_cached_signature():
+    token = make_token("real-user")
+    verify_token(token)
+    _, sig = token.split(".", 1)
+    forged = base64.urlsafe_b64encode(json.dumps({"sub": "admin", "iat": int(time.time())}).encode()).decode().rstrip("=")
+    with pytest.raises(HTTPException) as exc:
+        verify_token(f"{forged}.{sig}")
+    assert exc.value.status_code == 401
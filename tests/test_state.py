@@ -0,0 +1,60 @@
+import threading
+import time
+
+from app.core.state import SQLiteCache, SQLiteGeneration
+
+
+def test_sqlite_generation_is_shared_by_name():
+    a, b, other = SQLiteGeneration("test-gen"), SQLiteGeneration("test-gen"), SQLiteGeneration("test-gen-other")
+    start = a.value
+    assert a.bump() == start + 1
+    assert b.bump() == start + 2
+    assert a.value == b.value == start + 2
+    assert other.value == 0
+
+
+def test_sqlite_cache_round_trips_json_keys_and_values():
+    cache = SQLiteCache("test-roundtrip", max_entries=100, ttl=60, max_bytes=1 << 20)
+    cache.set((3, "query", 20, 0), [{"id": 1, "title": "t"}])
+    assert cache.get((3, "query", 20, 0)) == [{"id": 1, "title": "t"}]
+    assert cache.get((4, "query", 20, 0)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_sqlite_cache_update_is_atomic_across_threads():
+    cache = SQLiteCache("test-update", max_entries=100, ttl=60, max_bytes=1 << 20)
+
+    def bump():
+        for _ in range(50):
+            cache.update("counter", lambda v: (v or 0) + 1)
+
+    threads = [threading.Thread(target=bump) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.get("counter") == 400
+
+    assert cache.update("absent", lambda v: None) is None
+    assert cache.get("absent") is None
+
+
+def test_sqlite_cache_prune_enforces_the_caps():
+    cache = SQLiteCache("test-prune", max_entries=10, ttl=60, max_bytes=1 << 20, touch_interval=0)
+    for i in range(SQLiteCache.PRUNE_EVERY):
+        cache.set(i, {"value": i})
+        time.sleep(0.001)  # distinct used_at, so recency is well defined
+    assert len(cache) == 10
+    assert cache.stats()["evictions"] == SQLiteCache.PRUNE_EVERY - 10
+    assert cache.get(SQLiteCache.PRUNE_EVERY - 1) == {"value": SQLiteCache.PRUNE_EVERY - 1}
+    assert cache.get(0) is None
+
+
+def test_sqlite_cache_prune_drops_expired_entries_first():
+    cache = SQLiteCache("test-expiry", max_entries=1000, ttl=0.05, max_bytes=1 << 20)
+    for i in range(SQLiteCache.PRUNE_EVERY - 1):
+        cache.set(i, i)
+    time.sleep(0.1)
+    cache.set("fresh", 1)  # this write triggers the prune
+    assert len(cache) == 1
+    assert cache.stats()["expirations"] == SQLiteCache.PRUNE_EVERY - 1
@@ -0,0 +1,62 @@
+import asyncio
+import math
+import random
+
+from app.services.chat_service import estimate_tokens
+from app.services.summary_service import map_reduce, split_chunks
+
+BUDGET = 3000
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa"]
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(12)).capitalize() + "."
+
+
+def _assert_packed(text: str, chunks):
+    assert all(estimate_tokens(c) <= BUDGET for c in chunks)
+    # content-defined cuts only happen once a chunk is half full
+    assert len(chunks) <= 2 * math.ceil(estimate_tokens(text) / BUDGET) + 1
+
+
+def test_single_huge_paragraph_is_packed_to_the_budget():
+    rng = random.Random(1)
+    text = " ".join(_sentence(rng) for _ in range(1500))  # ~28k tokens, no paragraph breaks
+    chunks = split_chunks(text, BUDGET)
+    _assert_packed(text, chunks)
+
+
+def test_normal_paragraphs_are_packed_to_the_budget():
+    rng = random.Random(2)
+    text = "\n\n".join(" ".join(_sentence(rng) for _ in range(6)) for _ in range(300))
+    chunks = split_chunks(text, BUDGET)
+    _assert_packed(text, chunks)
+
+
+def test_text_under_budget_is_one_chunk():
+    assert split_chunks("short paragraph.\n\nanother one.", BUDGET) == ["short paragraph.\n\nanother one."]
+
+
+def test_map_reduce_calls_and_cache_bypass():
+    rng = random.Random(3)
+    text = "\n\n".join(" ".join(_sentence(rng) for _ in range(6)) for _ in range(200))
+    calls = []
+
+    async def llm(messages):
+        calls.append(messages)
+        return "partial summary."
+
+    async def run(**kwargs):
+        calls.clear()
+        result = await map_reduce(text, "test-model", llm, **kwargs)
+        return result, len(calls)
+
+    first, n_first = asyncio.run(run())
+    assert first["chunks"] > 1
+    assert n_first == first["chunks"]  # partials are tiny, so no reduce round
+
+    _, n_cached = asyncio.run(run())
+    assert n_cached == 0
+
+    _, n_bypass = asyncio.run(run(bypass_cache=True))
+    assert n_bypass == n_first